@@ -0,0 +1,34 @@
+"""Create the schema: tables, indexes, search indexes and facet stats.
+
+Run once per deploy, before the workers start:
+
+    python -m app.bootstrap
+
+Every step is idempotent, so running it against an existing database only
+adds what is missing.
+"""
+from .database import Base, get_engine
+from . import models  # noqa: F401  registers the tables
+from .facets import setup_facets
+from .search import setup_search
+
+
+def bootstrap(engine=None) -> str:
+    """Returns the search backend in use."""
+    engine = engine if engine is not None else get_engine()
+    Base.metadata.create_all(bind=engine)
+    # create_all skips indexes added to tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    backend = setup_search(engine)
+    setup_facets(engine)
+    return backend
+
+
+def main():
+    print(f"Schema ready; search backend: {bootstrap()}")
+
+
+if __name__ == "__main__":
+    main()
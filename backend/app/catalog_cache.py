@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+from fastapi import Request, Response
+
+from app.cache import TTLCache
+from app.config import settings
+from app.database import run_blocking
+from app.invalidation import broadcaster
+
+
+class MemoryBackend:
+    """In-process store exposing the subset of the redis-py API we use.
+
+    Counters restart from zero with the process, so ETags and keys built
+    from them are salted with a per-process ``epoch``.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if key in self._counters:
+            return str(self._counters[key])
+        return self._cache.get(key)
+
+    def set(self, key, value, ex=None):
+        self._cache.set(key, value, ttl=ex)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._cache.delete(key)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        # A new epoch, so no ETag handed out or key taken before can match
+        # again. The counters carry on: a read still in flight stores under
+        # the old epoch, where nothing looks any more
+        with self._lock:
+            self.epoch = uuid.uuid4().hex[:8]
+            self._cache.clear()
+
+
+class ThreadpoolBackend:
+    """Wraps a blocking client such as redis.Redis for the async routers.
+
+    They run the sync handlers on the event loop (AsyncSession.run_sync),
+    so each call is handed to the threadpool there; see run_blocking.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return run_blocking(self.client.get, key)
+
+    def set(self, key, value, ex=None):
+        return run_blocking(self.client.set, key, value, ex=ex)
+
+    def delete(self, *keys):
+        return run_blocking(self.client.delete, *keys)
+
+    def incr(self, key):
+        return run_blocking(self.client.incr, key)
+
+
+class CatalogCache:
+    """Read-through cache for serialized catalog responses.
+
+    Single sweets are cached under their id and version, which every write
+    to that sweet bumps; a read takes the version before querying, so a
+    read racing a write can only store its stale row under the old key.
+    Lists and searches are keyed by a catalog generation that every
+    write bumps, so any change retires all of them at once. Works with any
+    backend offering get/set(ex=)/delete/incr, e.g. a redis.Redis client.
+
+    The same counters drive ETags: a list's tag changes with the generation,
+    a single sweet's with its own version, so a conditional GET can be
+    answered without touching the database.
+    """
+
+    GENERATION_KEY = "catalog:gen"
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def epoch(self) -> str:
+        return getattr(self.backend, "epoch", "0")
+
+    def _counter(self, key: str) -> int:
+        value = self.backend.get(key)
+        return int(value) if value is not None else 0
+
+    def generation(self) -> int:
+        return self._counter(self.GENERATION_KEY)
+
+    def list_key(self, kind: str, **params) -> str:
+        return f"catalog:{self.epoch}:{self.generation()}:{kind}:{json.dumps(params, sort_keys=True)}"
+
+    def sweet_version(self, sweet_id: int) -> int:
+        return self._counter(self.version_key(sweet_id))
+
+    def sweet_key(self, sweet_id: int, version: int) -> str:
+        return f"sweet:{sweet_id}:{self.epoch}:{version}"
+
+    @staticmethod
+    def version_key(sweet_id: int) -> str:
+        return f"sweet:{sweet_id}:version"
+
+    def list_etag(self, key: str) -> str:
+        return f'"{self.epoch}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+    def sweet_etag(self, sweet_id: int, version: int = None) -> str:
+        if version is None:
+            version = self.sweet_version(sweet_id)
+        return f'"{self.epoch}-{sweet_id}-{version}"'
+
+    def get(self, key: str):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry = json.loads(value)
+        return Response(entry["body"], media_type="application/json", headers=entry["headers"])
+
+    def store(self, key: str, body: bytes, headers: dict = None) -> Response:
+        headers = headers or {}
+        body = body.decode() if isinstance(body, bytes) else body
+        self.backend.set(key, json.dumps({"body": body, "headers": headers}), ex=self.ttl)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *sweet_ids):
+        self.drop(*sweet_ids)
+        if isinstance(self.backend, MemoryBackend):
+            # Other workers hold their own copies; a shared backend such as
+            # Redis needs no broadcast
+            broadcaster.publish("catalog", None)
+            for sweet_id in sweet_ids:
+                broadcaster.publish("catalog", sweet_id)
+
+    def drop(self, *sweet_ids):
+        self.backend.incr(self.GENERATION_KEY)
+        for sweet_id in sweet_ids:
+            version = self.backend.incr(self.version_key(sweet_id))
+            # Nothing reads the old version's entry any more
+            self.backend.delete(self.sweet_key(sweet_id, version - 1))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(getattr(self.backend, "client", self.backend)).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def not_modified(request: Request, etag: str):
+    """Return a 304 response if the client already holds this ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    # Weak comparison (RFC 9110): compressed responses carry W/"..."
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def create_backend(kind: str):
+    if kind == "none":
+        # Stores nothing but still keeps the change counters ETags need
+        return MemoryBackend(max_size=0, ttl=settings.catalog_cache_ttl_seconds)
+    if kind == "memory":
+        return MemoryBackend(
+            max_size=settings.catalog_cache_max_size,
+            ttl=settings.catalog_cache_ttl_seconds,
+        )
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("catalog_cache_backend=redis requires the redis package")
+        return ThreadpoolBackend(redis.Redis.from_url(settings.redis_url))
+    raise ValueError(f"Unknown catalog cache backend: {kind}")
+
+
+catalog_cache = CatalogCache(
+    create_backend(settings.catalog_cache_backend),
+    ttl=settings.catalog_cache_ttl_seconds,
+)
+
+
+def _invalidated_elsewhere(items):
+    if items is None:
+        catalog_cache.backend.clear()
+    else:
+        catalog_cache.drop(*(sweet_id for sweet_id in items if sweet_id is not None))
+
+
+broadcaster.register("catalog", _invalidated_elsewhere)
+
+if hasattr(os, "register_at_fork") and isinstance(catalog_cache.backend, MemoryBackend):
+    # Forked workers count versions separately, so their ETags must differ
+    os.register_at_fork(after_in_child=catalog_cache.backend.clear)
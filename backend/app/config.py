@@ -1,19 +1,133 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Settings(BaseSettings):
-    database_hostname: str
-    database_port: str  
-    database_password: str
-    database_name: str
-    database_username: str
+    # Either a full SQLAlchemy URL (e.g. sqlite:///./sweets.db) or the
+    # PostgreSQL connection parts below
+    database_url: Optional[str] = None
+    database_hostname: Optional[str] = None
+    database_port: Optional[str] = None
+    database_password: Optional[str] = None
+    database_name: Optional[str] = None
+    database_username: Optional[str] = None
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
 
+    # Connection pool, sized so the request threadpool doesn't queue on it
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Open a fresh connection per checkout, e.g. behind PgBouncer
+    db_disable_pool: bool = False
+    # Per-statement limit in milliseconds; 0 disables it
+    db_statement_timeout_ms: int = 0
+    # Starlette threadpool that runs sync handlers
+    threadpool_size: int = 40
+    # Create missing tables and indexes when a worker starts instead of
+    # via `python -m app.bootstrap`; convenient for a single dev server
+    bootstrap_on_startup: bool = False
+    # Serve requests through the async routers and an async engine
+    # (asyncpg for PostgreSQL, aiosqlite for SQLite)
+    async_db: bool = False
+
+    # Authenticated-user cache (set user_cache_enabled=false to opt out)
+    user_cache_enabled: bool = True
+    user_cache_ttl_seconds: int = 60
+    user_cache_max_size: int = 1024
+
+    # Verified JWT claims, keyed by the raw token; entries never outlive "exp"
+    token_cache_enabled: bool = True
+    token_cache_ttl_seconds: int = 300
+    token_cache_max_size: int = 4096
+
+    # bcrypt runs on its own pool; "thread" or "process"
+    password_pool_kind: str = "thread"
+    password_pool_workers: int = 4
+    password_pool_max_queue: int = 32
+
+    # "auto" uses pg_trgm on PostgreSQL when available, else the in-memory
+    # n-gram index; "trigram" or "ngram" force one
+    search_backend: str = "auto"
+
+    # Catalog read cache: "memory", "redis" (needs the redis package) or "none"
+    catalog_cache_backend: str = "memory"
+    catalog_cache_ttl_seconds: int = 30
+    catalog_cache_max_size: int = 2048
+    redis_url: str = "redis://localhost:6379/0"
+
+    # Serve purchases from in-memory stock and write them to the database
+    # in batches (see app/write_behind.py); single worker process only
+    purchase_write_behind: bool = False
+    write_behind_flush_ms: int = 50
+    write_behind_journal: str = "write_behind.journal"
+    # fsync every reservation so sales also survive an OS crash
+    write_behind_fsync: bool = False
+
+    # Writes record their change to the facet stats (app/facets.py), which
+    # a background thread applies this often
+    facets_flush_ms: int = 200
+
+    # Request/DB/bcrypt metrics, served at /metrics in Prometheus format
+    metrics_enabled: bool = True
+
+    # Record every SQL statement per request (see app/profiling.py); the
+    # summary is served at /api/profiling/sql and flagged queries are logged
+    sql_profiling: bool = False
+    sql_slow_query_ms: float = 100.0
+    # Same statement this many times in one request counts as an N+1
+    sql_n_plus_one_threshold: int = 5
+    # Finished requests kept whole for the summary
+    sql_profile_history: int = 200
+
+    # Compress responses of at least this many bytes: brotli when the
+    # client accepts it and the brotli package is installed, else gzip
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    # Cache-Control for catalog reads. They need a token, hence private;
+    # no-cache has clients revalidate with the ETag, which is a cheap 304
+    catalog_cache_control: str = "private, no-cache"
+
+    # Token-bucket limits as "<requests>/<second|minute|hour>". The buckets
+    # live in this process ("memory") or in Redis ("redis", shared by all
+    # workers; needs the redis package)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_max_keys: int = 100_000
+    login_rate_per_ip: str = "30/minute"
+    login_rate_per_account: str = "10/minute"
+    purchase_rate_per_ip: str = "600/minute"
+    purchase_rate_per_user: str = "120/minute"
+    # Requests handled at once; beyond that new ones get a 503 (0 disables)
+    max_concurrent_requests: int = 256
+
+    # Rows per INSERT on bulk import and per fetch on export
+    bulk_chunk_size: int = 1000
+
+    # Worker processes started by `python -m app.serve`
+    workers: int = 1
+    host: str = "127.0.0.1"
+    port: int = 8000
+    # How workers tell each other to drop in-process cache entries after a
+    # write: "postgres" (LISTEN/NOTIFY), "local" (Unix sockets, one host
+    # only), "auto" (postgres on PostgreSQL, else local) or "none".
+    # app.serve picks "auto" when it starts more than one worker
+    invalidation_channel: str = "none"
+    # Where the "local" channel's sockets go. Every worker that must hear
+    # the others needs the same one; by default app.serve makes a temp
+    # directory for its own workers
+    invalidation_socket_dir: str = ""
+    # Add X-Worker-PID to every response, to see which worker answered
+    worker_pid_header: bool = False
+
     class Config:
         env_file=".env"
 
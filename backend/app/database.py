@@ -1,22 +1,173 @@
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from starlette.concurrency import run_in_threadpool
 from .config import settings
+from .metrics import instrument_engine, timed_pool
 
 
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+if settings.database_url:
+    SQLALCHEMY_DATABASE_URL = settings.database_url
+else:
+    SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, future=True)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# insert() constructs that support ON CONFLICT, per dialect
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def pool_options(url, overrides, pool_class=QueuePool):
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite picks its own pool class and doesn't take sizing options
+        return overrides
+    if settings.db_disable_pool:
+        return dict(poolclass=timed_pool(NullPool), **overrides)
+    options = dict(
+        poolclass=timed_pool(pool_class),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    options.update(overrides)
+    return options
+
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, **overrides):
+    connect_args = {}
+    if settings.db_statement_timeout_ms and make_url(url).get_backend_name() == "postgresql":
+        connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    return create_engine(url, future=True, connect_args=connect_args, **pool_options(url, overrides))
+
+
+def build_async_engine(url: str = SQLALCHEMY_DATABASE_URL, **overrides):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    connect_args = {}
+    if settings.db_statement_timeout_ms and backend == "postgresql":
+        connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+    return create_async_engine(
+        url.set(drivername=ASYNC_DRIVERS[backend]),
+        connect_args=connect_args,
+        **pool_options(url, overrides, AsyncAdaptedQueuePool),
+    )
+
+
+class LazySessionmaker(sessionmaker):
+    """Binds itself to the engine the first time a session is opened."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            get_engine()
+        return super().__call__(**local_kw)
+
+
+# Built by get_engine() on first use (the lifespan handler does it before
+# serving), so importing the app opens no connections
+_engine = None
+
+# Objects keep their loaded state after commit: every column is known once
+# the INSERT/UPDATE has run (ids come back from the write, defaults are
+# Python-side), so re-reading the row would be a wasted round trip
+SessionLocal = LazySessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+
+# Only built when something asks for it, so the async drivers are needed
+# just for async_db deployments
+async_engine = None
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = build_engine()
+        instrument_engine(_engine)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def __getattr__(name):
+    # Keeps `from app.database import engine` working without building the
+    # engine at import
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        async_engine = build_async_engine()
+        instrument_engine(async_engine.sync_engine)
+        AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+
+def active_engine():
+    """The engine request handlers' queries go through.
+
+    Under async_db that is the async engine's sync core, which is where
+    events such as before_cursor_execute fire.
+    """
+    if settings.async_db:
+        return get_async_engine().sync_engine
+    return get_engine()
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Call a blocking function without stalling the event loop.
+
+    The async routers run the sync handlers on the event loop through
+    AsyncSession.run_sync; there, I/O that doesn't go through the session
+    (e.g. Redis) is handed to the threadpool. Anywhere else the caller is
+    already on a thread and ``fn`` is simply called.
+    """
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
+
+
+def upsert_insert(bind):
+    try:
+        return UPSERT_INSERTS[bind.dialect.name]
+    except KeyError:
+        raise NotImplementedError(f"No ON CONFLICT support for {bind.dialect.name}")
+
+
+def pool_status() -> dict:
+    pool = async_engine.pool if settings.async_db and async_engine else get_engine().pool
+    if not hasattr(pool, "size"):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.db_max_overflow,
+        "timeout": pool.timeout(),
+    }
+
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,269 @@
+import logging
+import threading
+
+from sqlalchemy import case, delete, exists, func, select
+from sqlalchemy.orm import Session
+
+from app.catalog_cache import catalog_cache
+from app.config import settings
+from app.database import SessionLocal, upsert_insert
+from app.models import CategoryStats, Sweet
+
+logger = logging.getLogger(__name__)
+
+STAT_COLUMNS = ("sweets", "in_stock", "price_sum", "min_price", "max_price")
+
+
+def _lower(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _higher(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def empty_delta() -> dict:
+    return {
+        "sweets": 0, "in_stock": 0, "price_sum": 0.0,
+        # Cheapest/dearest price added to and removed from the category
+        "min_added": None, "max_added": None, "min_removed": None, "max_removed": None,
+    }
+
+
+def delta_statement(db: Session, category: str, delta: dict):
+    """Upsert adding one category's delta to its stats row.
+
+    Counts and sums only ever have deltas added, so concurrent flushes
+    (from other workers too) can't overwrite each other, even for a
+    category whose row doesn't exist yet. min/max take the lower/higher of
+    the stored and added prices; only when the sweet at the stored min or
+    max was removed or repriced are they rescanned, through the category
+    index.
+    """
+    insert = upsert_insert(db.get_bind())
+    stmt = insert(CategoryStats).values(
+        category=category,
+        sweets=delta["sweets"],
+        in_stock=delta["in_stock"],
+        price_sum=delta["price_sum"],
+        min_price=delta["min_added"],
+        max_price=delta["max_added"],
+    )
+
+    min_price, max_price = CategoryStats.min_price, CategoryStats.max_price
+    if delta["min_added"] is not None:
+        min_price = case((CategoryStats.min_price <= delta["min_added"], CategoryStats.min_price),
+                         else_=delta["min_added"])
+    if delta["max_added"] is not None:
+        max_price = case((CategoryStats.max_price >= delta["max_added"], CategoryStats.max_price),
+                         else_=delta["max_added"])
+    if delta["min_removed"] is not None:
+        rescan = select(func.min(Sweet.price)).where(Sweet.category == category).scalar_subquery()
+        min_price = case((CategoryStats.min_price >= delta["min_removed"], rescan), else_=min_price)
+    if delta["max_removed"] is not None:
+        rescan = select(func.max(Sweet.price)).where(Sweet.category == category).scalar_subquery()
+        max_price = case((CategoryStats.max_price <= delta["max_removed"], rescan), else_=max_price)
+
+    return stmt.on_conflict_do_update(
+        index_elements=[CategoryStats.category],
+        set_={
+            "sweets": CategoryStats.sweets + stmt.excluded.sweets,
+            "in_stock": CategoryStats.in_stock + stmt.excluded.in_stock,
+            "price_sum": CategoryStats.price_sum + stmt.excluded.price_sum,
+            "min_price": min_price,
+            "max_price": max_price,
+        },
+    )
+
+
+class StatsDeltas:
+    """Changes to category_stats, recorded per category and applied in batches.
+
+    Write handlers record what they changed once their own transaction has
+    committed, so requests never touch category_stats: purchases of sweets
+    in the same category don't queue on its row. A background thread folds
+    everything recorded since its last run into one upsert per category
+    (see delta_statement).
+
+    The stats trail the sweets table by up to one flush interval, and
+    deltas not yet flushed are lost if the process dies; refresh() rebuilds
+    the table from sweets.
+    """
+
+    def __init__(self, session_factory, flush_interval: float):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="facet-stats", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._start_lock:
+            if self._thread is None:
+                return
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Facet stats flush failed; will retry")
+
+    def _merge(self, category, delta: dict):
+        # Caller holds self._lock
+        current = self._pending.setdefault(category, empty_delta())
+        for column in ("sweets", "in_stock", "price_sum"):
+            current[column] += delta.get(column, 0)
+        for column in ("min_added", "min_removed"):
+            current[column] = _lower(current[column], delta.get(column))
+        for column in ("max_added", "max_removed"):
+            current[column] = _higher(current[column], delta.get(column))
+
+    def record(self, old=None, new=None):
+        """A sweet went from ``old`` to ``new``.
+
+        Each is a (category, price, quantity) tuple, or None when the sweet
+        was created or deleted.
+        """
+        if old is not None and new is not None and tuple(old[:2]) == tuple(new[:2]):
+            self.add_stock({new[0]: (new[2] or 0) - (old[2] or 0)})
+            return
+        with self._lock:
+            if old is not None and old[0] is not None:
+                category, price, quantity = old
+                self._merge(category, {
+                    "sweets": -1, "in_stock": -(quantity or 0), "price_sum": -price,
+                    "min_removed": price, "max_removed": price,
+                })
+            if new is not None and new[0] is not None:
+                category, price, quantity = new
+                self._merge(category, {
+                    "sweets": 1, "in_stock": quantity or 0, "price_sum": price,
+                    "min_added": price, "max_added": price,
+                })
+
+    def add_stock(self, deltas: dict):
+        """Add deltas[category] units to each category's in-stock total."""
+        with self._lock:
+            for category, units in deltas.items():
+                if category is not None and units:
+                    self._merge(category, {"in_stock": units})
+
+    def flush(self) -> int:
+        """Apply the recorded deltas; returns the number of categories changed."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+            db = self.session_factory()
+            try:
+                # The same order in every worker, so flushes can't deadlock
+                for category in sorted(batch):
+                    db.execute(delta_statement(db, category, batch[category]))
+                db.execute(
+                    delete(CategoryStats)
+                    .where(CategoryStats.category.in_(batch), CategoryStats.sweets <= 0)
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+            except Exception:
+                with self._lock:
+                    for category, delta in batch.items():
+                        self._merge(category, delta)
+                raise
+            finally:
+                db.close()
+        catalog_cache.invalidate()
+        return len(batch)
+
+
+def facet_values(sweet) -> tuple:
+    """The (category, price, quantity) of a sweet, as StatsDeltas.record takes."""
+    return sweet.category, sweet.price, sweet.quantity
+
+
+def stock_deltas(rows, totals: dict, sign: int = 1) -> dict:
+    """Per-category sums of totals[id] for rows carrying id and category."""
+    deltas = {}
+    for row in rows:
+        deltas[row["category"]] = deltas.get(row["category"], 0) + sign * totals[row["id"]]
+    return deltas
+
+
+def refresh(db: Session):
+    """Rebuild category_stats from sweets, in the caller's transaction.
+
+    For scripts that change sweets behind the API's back, and to repair
+    drift. Flush stats first, or deltas already counted here are added
+    again.
+    """
+    source = select(
+        Sweet.category,
+        func.count(),
+        func.coalesce(func.sum(Sweet.quantity), 0),
+        func.sum(Sweet.price),
+        func.min(Sweet.price),
+        func.max(Sweet.price),
+    ).where(Sweet.category.isnot(None)).group_by(Sweet.category)
+    insert = upsert_insert(db.get_bind())
+    stmt = insert(CategoryStats).from_select(["category", *STAT_COLUMNS], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CategoryStats.category],
+        set_={column: stmt.excluded[column] for column in STAT_COLUMNS},
+    )
+    db.execute(stmt)
+    stale = delete(CategoryStats).where(~exists().where(Sweet.category == CategoryStats.category))
+    db.execute(stale.execution_options(synchronize_session=False))
+
+
+def load(db: Session) -> dict:
+    categories = []
+    sweets = in_stock = 0
+    min_price = max_price = None
+    for stats in db.query(CategoryStats).order_by(CategoryStats.category):
+        categories.append({
+            "category": stats.category,
+            "sweets": stats.sweets,
+            "in_stock": stats.in_stock,
+            "min_price": stats.min_price,
+            "max_price": stats.max_price,
+            "avg_price": round(stats.price_sum / stats.sweets, 2),
+        })
+        sweets += stats.sweets
+        in_stock += stats.in_stock
+        min_price = stats.min_price if min_price is None else min(min_price, stats.min_price)
+        max_price = stats.max_price if max_price is None else max(max_price, stats.max_price)
+    return {
+        "categories": categories,
+        "sweets": sweets,
+        "in_stock": in_stock,
+        "min_price": min_price,
+        "max_price": max_price,
+    }
+
+
+def setup_facets(engine):
+    """Build the stats table from sweets if it is empty, e.g. on upgrade."""
+    with Session(engine) as db:
+        if db.query(CategoryStats.category).first() is None and db.query(Sweet.id).first() is not None:
+            refresh(db)
+            db.commit()
+
+
+stats = StatsDeltas(SessionLocal, settings.facets_flush_ms / 1000)
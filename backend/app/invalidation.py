@@ -0,0 +1,257 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import select
+import socket
+import tempfile
+import threading
+import uuid
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "sweetshop_invalidation"
+# NOTIFY payloads must stay under 8000 bytes; bigger batches are sent as
+# "drop everything of this kind" instead
+MAX_PAYLOAD = 7900
+
+
+class Broadcaster:
+    """Tells the other worker processes about writes to in-process state.
+
+    Modules holding per-process state (catalog cache, search index, user
+    cache) ``register`` a handler for their kind of message and
+    ``publish`` a key for every entry they change locally. A sender
+    thread coalesces what was published since its last send into one
+    message per kind, so a bulk import costs a handful of messages. The
+    other workers call the handler with ``{key: value}``, or with None
+    when messages may have been lost (an oversized batch, a reconnect),
+    meaning "forget everything".
+
+    Nothing is sent until ``start`` is given a channel, so a single
+    worker pays nothing. Delivery is best effort: a message lost while the
+    database is unreachable leaves the other workers' cache entries to
+    expire by TTL.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.handlers = {}
+        self.channel = None
+        self.sent = 0
+        self.received = 0
+        self._queue = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def register(self, kind: str, handler):
+        self.handlers[kind] = handler
+
+    def publish(self, kind: str, key, value=None):
+        if self.channel is not None:
+            self._queue.put((kind, key, value))
+
+    def start(self, channel):
+        if self.channel is not None:
+            return
+        self.channel = channel
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._send_loop, name="invalidation-send", daemon=True),
+            threading.Thread(target=self._listen_loop, name="invalidation-listen", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        if self.channel is None:
+            return
+        self._stop.set()
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.channel.close()
+        self.channel = None
+
+    def encode(self, batch: dict) -> list:
+        payloads = []
+        for kind, items in batch.items():
+            payload = json.dumps({"origin": self.origin, "kind": kind, "items": list(items.items())})
+            if len(payload.encode()) > MAX_PAYLOAD:
+                payload = json.dumps({"origin": self.origin, "kind": kind, "items": None})
+            payloads.append(payload)
+        return payloads
+
+    def deliver(self, payload: str):
+        message = json.loads(payload)
+        if message["origin"] == self.origin:
+            return
+        handler = self.handlers.get(message["kind"])
+        if handler is None:
+            return
+        self.received += 1
+        items = message["items"]
+        handler(None if items is None else {key: value for key, value in items})
+
+    def reset(self):
+        """Forget all in-process state, e.g. after missing messages."""
+        for handler in self.handlers.values():
+            handler(None)
+
+    def _send_loop(self):
+        while not self._stop.is_set():
+            message = self._queue.get()
+            batch = {}
+            while message is not None:
+                kind, key, value = message
+                # Later writes to the same key win
+                batch.setdefault(kind, {})[key] = value
+                try:
+                    message = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            for payload in self.encode(batch):
+                try:
+                    self.channel.send(payload)
+                    self.sent += 1
+                except Exception:
+                    logger.exception("Could not publish an invalidation")
+
+    def _listen_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.channel.listen(self.deliver, self._stop, on_connect=self.reset)
+            except Exception:
+                logger.exception("Invalidation listener failed; reconnecting")
+                self._stop.wait(1)
+
+
+class PostgresChannel:
+    """PostgreSQL LISTEN/NOTIFY on one dedicated connection per worker."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        # Outside the pool: the listening connection is held for good
+        self.listen_engine = create_engine(engine.url, poolclass=NullPool)
+
+    def send(self, payload: str):
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+    def listen(self, deliver, stop: threading.Event, on_connect):
+        raw = self.listen_engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            # Anything sent while we weren't listening is gone
+            on_connect()
+            while not stop.is_set():
+                if select.select([conn], [], [], 0.5)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        deliver(conn.notifies.pop(0).payload)
+        finally:
+            raw.close()
+
+    def close(self):
+        self.listen_engine.dispose()
+
+
+class LocalChannel:
+    """Unix datagram sockets in a shared directory: one per worker.
+
+    The stand-in for LISTEN/NOTIFY when the database can't provide it,
+    e.g. SQLite; it only reaches workers on the same host.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.settimeout(0.5)
+
+    def send(self, payload: str):
+        data = payload.encode()
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "*.sock")):
+            if path == self.path:
+                continue
+            try:
+                self.sock.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a worker that exited without cleaning up
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def listen(self, deliver, stop: threading.Event, on_connect):
+        on_connect()
+        while not stop.is_set():
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            deliver(data.decode())
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def resolve_channel(kind: str, database_url: str) -> str:
+    postgres = make_url(database_url).get_backend_name() == "postgresql"
+    if kind == "auto":
+        return "postgres" if postgres else "local"
+    if kind == "postgres" and not postgres:
+        raise ValueError(
+            "invalidation_channel=postgres needs a PostgreSQL database; "
+            "use local (or auto) with this DATABASE_URL"
+        )
+    return kind
+
+
+def default_socket_dir(database_url: str) -> str:
+    """Socket directory for the workers of one launcher and database.
+
+    app.serve passes its workers a directory of their own; without one,
+    workers started by the same parent process (e.g. uvicorn --workers)
+    share this, and other deployments on the host don't.
+    """
+    database = hashlib.sha1(database_url.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"sweetshop-invalidation-{os.getppid()}-{database}")
+
+
+def create_channel(kind: str):
+    from app.database import SQLALCHEMY_DATABASE_URL, get_engine
+
+    kind = resolve_channel(kind, SQLALCHEMY_DATABASE_URL)
+    if kind == "none":
+        return None
+    if kind == "postgres":
+        return PostgresChannel(get_engine())
+    if kind == "local":
+        return LocalChannel(settings.invalidation_socket_dir or default_socket_dir(SQLALCHEMY_DATABASE_URL))
+    raise ValueError(f"Unknown invalidation channel: {kind}")
+
+
+broadcaster = Broadcaster()
+
+if hasattr(os, "register_at_fork"):
+    # Workers forked by app.serve must not recognise each other's messages
+    # as their own
+    os.register_at_fork(after_in_child=lambda: setattr(broadcaster, "origin", uuid.uuid4().hex))
@@ -1,16 +1,59 @@
-from fastapi import FastAPI
-from .database import Base, engine
-from . import models
-from .routers import auth,sweets,inventory
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
+from .config import settings
+from .database import get_async_engine, get_engine, pool_status
+from .routers import auth,sweets,inventory,bulk,profiling as profiling_router
+from .routers import async_auth,async_sweets,async_inventory
+from .bootstrap import bootstrap
+from .password_pool import password_pool
+from .invalidation import broadcaster, create_channel
+from . import facets, write_behind
+from . import metrics
+from . import profiling
+from .middleware import AdmissionMiddleware, CacheControlMiddleware, CompressionMiddleware, WorkerPIDMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
-try:
-    Base.metadata.create_all(bind=engine)
-    print("Tables created successfully")
-except Exception as e:
-    print(f"Error creating tables: {e}")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync handlers each hold a pooled connection, so size these together
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    # Schema changes belong to `python -m app.bootstrap`, run once per
+    # deploy rather than by every worker as it imports the app
+    if settings.bootstrap_on_startup:
+        await to_thread.run_sync(bootstrap)
+    get_engine()
+    if settings.async_db:
+        get_async_engine()
+    channel = create_channel(settings.invalidation_channel)
+    if channel is not None:
+        broadcaster.start(channel)
+    if settings.purchase_write_behind:
+        # Replays reservations a previous run journaled but never flushed
+        write_behind.stock.start()
+    facets.stats.start()
+    yield
+    # Each flush below feeds the next: stock into the facet stats, both
+    # into invalidations
+    write_behind.stock.stop()
+    facets.stats.stop()
+    broadcaster.stop()
+    password_pool.shutdown()
+    if settings.async_db:
+        # Its connections belong to this event loop
+        await get_async_engine().dispose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+
+if settings.max_concurrent_requests:
+    # Inside CORS, so browsers can read the 503
+    app.add_middleware(
+        AdmissionMiddleware,
+        max_concurrent=settings.max_concurrent_requests,
+        exempt={"/", "/health/pool", "/metrics"},
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,12 +61,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+CACHE_POLICIES = {
+    ("GET", "/api/sweets"): settings.catalog_cache_control,
+    ("GET", "/api/sweets/search"): settings.catalog_cache_control,
+    ("GET", "/api/sweets/facets"): settings.catalog_cache_control,
+    ("GET", "/api/sweets/{sweet_id}"): settings.catalog_cache_control,
+    # Token responses must never be stored (RFC 6749, section 5.1)
+    ("POST", "/api/auth/login"): "no-store",
+}
+app.add_middleware(CacheControlMiddleware, policies=CACHE_POLICIES)
+
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.gzip_level,
+        brotli_quality=settings.brotli_quality,
+    )
+
+if settings.worker_pid_header:
+    app.add_middleware(WorkerPIDMiddleware)
+
+if settings.metrics_enabled:
+    # Outermost, so the timings include CORS and everything below it
+    app.add_middleware(metrics.MetricsMiddleware)
+
+if settings.sql_profiling:
+    profiling.enable()
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.include_router(profiling_router.router)
+
 @app.get("/")
 def message():
     return {"message": "API RUNNING"}
 
-app.include_router(auth.router)
-app.include_router(sweets.router)
-app.include_router(inventory.router)
\ No newline at end of file
+@app.get("/health/pool")
+def database_pool():
+    return pool_status()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    pool = pool_status()
+    for state in ("checked_in", "checked_out", "overflow"):
+        if state in pool:
+            metrics.POOL_CONNECTIONS.set(pool[state], state=state)
+    metrics.PASSWORD_POOL_PENDING.set(password_pool.pending)
+    metrics.PASSWORD_POOL_REJECTED.set(password_pool.rejected)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Fixed paths like /api/sweets/export must match before /api/sweets/{sweet_id}
+app.include_router(bulk.router)
+
+routers = [auth.router, sweets.router, inventory.router]
+
+if settings.async_db:
+    async_routers = [async_auth.router, async_sweets.router, async_inventory.router]
+    for router in async_routers:
+        app.include_router(router)
+    # Sync routes without an async counterpart (admin tooling) still serve
+    overridden = {
+        (route.path, method)
+        for router in async_routers
+        for route in router.routes
+        for method in route.methods
+    }
+    routers = [
+        APIRouter(routes=[
+            route for route in router.routes
+            if not {(route.path, method) for method in route.methods} & overridden
+        ])
+        for router in routers
+    ]
+
+for router in routers:
+    app.include_router(router)
\ No newline at end of file
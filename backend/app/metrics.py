@@ -0,0 +1,269 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for the counters, gauges and histograms rendered by /metrics.
+
+    Values are kept per combination of label values, in the order given by
+    ``labelnames``. Only what the Prometheus text format needs is here, so
+    the app doesn't depend on prometheus_client.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, format_labels(self.labelnames, key), value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # First bucket whose bound is >= value; len(buckets) means +Inf only
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (not cumulative), plus sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                yield f"{self.name}_bucket", format_labels(self.labelnames, key, [("le", format_value(float(bound)))]), cumulative
+            yield f"{self.name}_bucket", format_labels(self.labelnames, key, [("le", "+Inf")]), count
+            yield f"{self.name}_sum", format_labels(self.labelnames, key), total
+            yield f"{self.name}_count", format_labels(self.labelnames, key), count
+
+
+registry = []
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+QUERIES = Counter("db_queries_total", "SQL statements executed.")
+QUERY_SECONDS = Counter("db_query_seconds_total", "Time spent executing SQL statements.")
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request.", ("route",), QUERY_COUNT_BUCKETS
+)
+REQUEST_QUERY_SECONDS = Histogram(
+    "db_query_seconds_per_request", "Time spent in SQL per HTTP request.", ("route",)
+)
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.",
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+PASSWORD_SECONDS = Histogram(
+    "password_hash_seconds", "bcrypt hash/verify time, including waiting for the password pool.", ("op",)
+)
+SERIALIZE_SECONDS = Histogram(
+    "response_serialization_seconds", "Time spent encoding catalog responses.", ("kind",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+
+# Sampled when /metrics is scraped
+POOL_CONNECTIONS = Gauge("db_pool_connections", "Pooled connections by state.", ("state",))
+PASSWORD_POOL_PENDING = Gauge("password_pool_pending", "bcrypt jobs running or queued.")
+PASSWORD_POOL_REJECTED = Gauge("password_pool_rejected", "bcrypt jobs turned away with a 503 so far.")
+
+# Per-request [statement count, seconds], set by the middleware; sync
+# handlers run in the threadpool with a copy of the context, so they add
+# to the same list
+request_queries = ContextVar("request_queries", default=None)
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a failed statement leaves nothing behind
+    context.query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_start
+    QUERIES.inc()
+    QUERY_SECONDS.inc(elapsed)
+    stats = request_queries.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def instrument_engine(engine):
+    """Count and time every statement sent through a (sync) engine."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstrument_engine(engine):
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def timed_pool(pool_class):
+    """Subclass a pool class so checkouts report how long they waited."""
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = pool_class.__name__
+    return TimedPool
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route counts and latencies.
+
+    Routes are labelled by their path template (/api/sweets/{sweet_id}),
+    so label sets stay bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = request_queries.set(stats)
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            request_queries.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            REQUESTS.inc(method=method, route=path, status=status_code)
+            REQUEST_SECONDS.observe(elapsed, method=method, route=path)
+            REQUEST_QUERIES.observe(stats[0], route=path)
+            REQUEST_QUERY_SECONDS.observe(stats[1], route=path)
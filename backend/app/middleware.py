@@ -0,0 +1,174 @@
+import os
+import threading
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(header: str) -> set:
+    """Codings the client accepts, dropping any it refuses with q=0."""
+    accepted = set()
+    for part in header.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        if coding.strip():
+            accepted.add(coding.strip())
+    return accepted
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int = 4):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            # No flush per chunk, as with gzip: small streamed chunks would
+            # each end a block and come out bigger than they went in
+            return self.compressor.process(body)
+        return self.compressor.process(body) + self.compressor.finish()
+
+
+class CompressionMiddleware:
+    """gzip/brotli for responses of at least ``minimum_size`` bytes.
+
+    Brotli is preferred when the client accepts it and the brotli package
+    is installed. A compressed response's ETag is made weak, since the
+    bytes on the wire are no longer the ones it was computed for.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in accepted:
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if "content-encoding" in headers and headers.get("etag", "W/").startswith('"'):
+                    headers["etag"] = "W/" + headers["etag"]
+            await send(message)
+
+        await responder(scope, receive, send_wrapper)
+
+
+class CacheControlMiddleware:
+    """Set Cache-Control on successful responses of the routes in ``policies``.
+
+    ``policies`` maps (method, route path template) pairs, e.g.
+    ("GET", "/api/sweets/{sweet_id}"), to the header value; a handler that
+    sets its own Cache-Control wins.
+    """
+
+    def __init__(self, app, policies: dict):
+        self.app = app
+        self.policies = policies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                route = scope.get("route")
+                policy = self.policies.get((scope["method"], route.path)) if route is not None else None
+                if policy is not None:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.setdefault("cache-control", policy)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class WorkerPIDMiddleware:
+    """Add X-Worker-PID, the id of the process that answered, to responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Looked up per response: workers fork after this is built
+                MutableHeaders(raw=message["headers"])["x-worker-pid"] = str(os.getpid())
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class AdmissionMiddleware:
+    """Shed requests with a 503 once ``max_concurrent`` are in progress.
+
+    Turning work away at the door keeps latency bounded for the requests
+    already admitted, instead of letting every request slow down together.
+    Paths in ``exempt`` (health checks, metrics) are always let through.
+    """
+
+    def __init__(self, app, max_concurrent: int, exempt=()):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.exempt = frozenset(exempt)
+        self.in_flight = 0
+        self.rejected = 0
+        # Not an asyncio primitive: TestClient may run requests on
+        # different event loops
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        with self._lock:
+            admitted = self.in_flight < self.max_concurrent
+            if admitted:
+                self.in_flight += 1
+            else:
+                self.rejected += 1
+        if not admitted:
+            response = JSONResponse(
+                {"detail": "Server busy, retry shortly"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Index
 from .database import Base
 
 class User(Base):
@@ -17,4 +17,26 @@ class Sweet(Base):
     name = Column(String, unique=True, nullable=False)
     category = Column(String, index=True)
     price = Column(Float, nullable=False)
-    quantity = Column(Integer, default=0)
\ No newline at end of file
+    quantity = Column(Integer, default=0)
+
+    # Backs keyset pagination ordered by price
+    __table_args__ = (Index("ix_sweets_price_id", "price", "id"),)
+
+class WriteBehindCheckpoint(Base):
+    __tablename__ = "write_behind_checkpoints"
+
+    # Last journal entry applied to sweets, per write-behind journal
+    journal = Column(String, primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
+
+class CategoryStats(Base):
+    __tablename__ = "category_stats"
+
+    # Per-category aggregates behind GET /api/sweets/facets, kept up to
+    # date from the changes write handlers record (see app/facets.py)
+    category = Column(String, primary_key=True)
+    sweets = Column(Integer, nullable=False, default=0)
+    in_stock = Column(BigInteger, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0)
+    min_price = Column(Float)
+    max_price = Column(Float)
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.metrics import PASSWORD_SECONDS
+from app.utils import get_password_hash, verify_password
+
+
+class PasswordPool:
+    """Bounded executor for bcrypt work.
+
+    Hashing runs off the event loop and off Starlette's threadpool, so a
+    login storm can't starve catalog reads. Once ``workers + max_queue``
+    jobs are in flight, new ones are rejected with a 503 straight away
+    instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError("Password pool kind must be 'thread' or 'process'")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        # Lower priority so hashing yields the CPU to request handling
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            initializer=os.nice,
+                            initargs=(10,),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server busy, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(
+    workers=settings.password_pool_workers,
+    max_queue=settings.password_pool_max_queue,
+    kind=settings.password_pool_kind,
+)
+
+
+async def hash_password(password: str) -> str:
+    with PASSWORD_SECONDS.time(op="hash"):
+        return await password_pool.run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    with PASSWORD_SECONDS.time(op="verify"):
+        return await password_pool.run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,197 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists differ in length per call; fold them so the same query
+# shape is counted together
+IN_LIST = re.compile(r"\(\s*(?:%\([^)]*\)s|\?|\$\d+)(?:\s*,\s*(?:%\([^)]*\)s|\?|\$\d+))*\s*\)")
+WHITESPACE = re.compile(r"\s+")
+MAX_SQL_LENGTH = 1000
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+def normalize(statement: str) -> str:
+    return IN_LIST.sub("(...)", WHITESPACE.sub(" ", statement).strip())[:MAX_SQL_LENGTH]
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.statements = []
+
+
+class SQLProfiler:
+    """Per-request SQL statement log with slow-query and N+1 detection.
+
+    Statements are attributed to the request that issued them through a
+    context variable set by ProfilingMiddleware. Finished requests are
+    folded into per-route and per-statement totals and the last
+    ``history`` of them are kept whole; anything slow or repetitive is
+    also logged to the ``app.profiling`` logger.
+    """
+
+    def __init__(self, slow_query_ms: float, n_plus_one_threshold: int, history: int):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.recent = deque(maxlen=history)
+        self.routes = {}
+        self.statements = {}
+        self._lock = threading.Lock()
+
+    def record(self, profile: RequestProfile, route: str, status: int, elapsed: float):
+        counts = {}
+        for sql, _ in profile.statements:
+            counts[sql] = counts.get(sql, 0) + 1
+        slow = [
+            {"sql": sql, "ms": round(seconds * 1000, 3)}
+            for sql, seconds in profile.statements
+            if seconds * 1000 >= self.slow_query_ms
+        ]
+        repeated = [
+            {"sql": sql, "count": count}
+            for sql, count in counts.items()
+            if count >= self.n_plus_one_threshold
+        ]
+        sql_seconds = sum(seconds for _, seconds in profile.statements)
+        name = f"{profile.method} {route}"
+
+        for entry in slow:
+            logger.warning("Slow query (%.1f ms) in %s: %s", entry["ms"], name, entry["sql"])
+        for entry in repeated:
+            logger.warning("Possible N+1 in %s: %d x %s", name, entry["count"], entry["sql"])
+
+        with self._lock:
+            totals = self.routes.setdefault(name, {
+                "requests": 0, "statements": 0, "max_statements": 0, "sql_ms": 0.0,
+                "slow_statements": 0, "n_plus_one_requests": 0,
+            })
+            totals["requests"] += 1
+            totals["statements"] += len(profile.statements)
+            totals["max_statements"] = max(totals["max_statements"], len(profile.statements))
+            totals["sql_ms"] += sql_seconds * 1000
+            totals["slow_statements"] += len(slow)
+            totals["n_plus_one_requests"] += bool(repeated)
+
+            for sql, seconds in profile.statements:
+                stats = self.statements.setdefault(sql, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()})
+                stats["count"] += 1
+                stats["total_ms"] += seconds * 1000
+                stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+                stats["routes"].add(name)
+
+            self.recent.append({
+                "route": name,
+                "path": profile.path,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 3),
+                "sql_ms": round(sql_seconds * 1000, 3),
+                "statements": [{"sql": sql, "ms": round(seconds * 1000, 3)} for sql, seconds in profile.statements],
+                "slow": slow,
+                "n_plus_one": repeated,
+            })
+
+    def summary(self, top: int = 20) -> dict:
+        with self._lock:
+            routes = {
+                name: dict(
+                    totals,
+                    sql_ms=round(totals["sql_ms"], 3),
+                    avg_statements=round(totals["statements"] / totals["requests"], 2),
+                )
+                for name, totals in self.routes.items()
+            }
+            statements = sorted(self.statements.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+            return {
+                "slow_query_ms": self.slow_query_ms,
+                "n_plus_one_threshold": self.n_plus_one_threshold,
+                "routes": routes,
+                "top_statements": [
+                    {
+                        "sql": sql,
+                        "count": stats["count"],
+                        "total_ms": round(stats["total_ms"], 3),
+                        "max_ms": round(stats["max_ms"], 3),
+                        "routes": sorted(stats["routes"]),
+                    }
+                    for sql, stats in statements
+                ],
+                "recent": list(self.recent),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self.routes.clear()
+            self.statements.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        context.profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.statements.append((normalize(statement), time.perf_counter() - context.profile_start))
+
+
+def enable():
+    """Listen on every engine, sync and async alike."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def disable():
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_profile.reset(token)
+            route = scope.get("route")
+            profiler.record(profile, route.path if route is not None else "unmatched", status_code, elapsed)
+
+
+profiler = SQLProfiler(
+    slow_query_ms=settings.sql_slow_query_ms,
+    n_plus_one_threshold=settings.sql_n_plus_one_threshold,
+    history=settings.sql_profile_history,
+)
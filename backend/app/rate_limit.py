@@ -0,0 +1,153 @@
+import threading
+import time
+from functools import lru_cache
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models import User
+from app.utils import get_current_user, get_current_user_async
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+# Refills a bucket for the time since its last request, then takes the
+# cost if enough tokens are left; returns the seconds to wait otherwise.
+# Redis's clock is used so every worker agrees on "now".
+REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate = capacity / period
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens < cost then
+    wait = (cost - tokens) / rate
+else
+    tokens = tokens - cost
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(period))
+return tostring(wait)
+"""
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate: str):
+    """'30/minute' -> (30, 60): bucket capacity and seconds to refill it."""
+    count, _, period = rate.partition("/")
+    try:
+        return int(count), PERIODS[period.strip()]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '30/minute'")
+
+
+class MemoryBuckets:
+    """Token buckets for one process, least recently used dropped first.
+
+    A bucket untouched for a whole period is full again, so it is safe to
+    forget; that is the TTL each one is stored with. ``clock`` can be
+    swapped for a fake in tests.
+    """
+
+    def __init__(self, max_size: int = 100_000, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = TTLCache(max_size=max_size, ttl=float("inf"))
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, period: float, cost: int = 1) -> float:
+        rate = capacity / period
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens < cost:
+                wait = (cost - tokens) / rate
+            else:
+                tokens -= cost
+            self._buckets.set(key, (tokens, now), ttl=period)
+            return wait
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker through one Redis server."""
+
+    def __init__(self, client):
+        self._take = client.register_script(REDIS_TAKE)
+
+    def take(self, key: str, capacity: int, period: float, cost: int = 1) -> float:
+        return float(self._take(keys=[f"ratelimit:{key}"], args=[capacity, period, cost]))
+
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+        self.rejected = 0
+
+    def hit(self, name: str, key, rate: str):
+        """Spend one token from the ``name`` bucket of ``key`` or raise a 429."""
+        if not settings.rate_limit_enabled:
+            return
+        capacity, period = parse_rate(rate)
+        wait = self.backend.take(f"{name}:{key}", capacity, period)
+        if wait > 0:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, slow down",
+                headers={"Retry-After": str(max(1, round(wait)))},
+            )
+
+
+def create_backend(kind: str):
+    if kind == "memory":
+        return MemoryBuckets(max_size=settings.rate_limit_max_keys)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("rate_limit_backend=redis requires the redis package")
+        return RedisBuckets(redis.Redis.from_url(settings.redis_url))
+    raise ValueError(f"Unknown rate limit backend: {kind}")
+
+
+rate_limiter = RateLimiter(create_backend(settings.rate_limit_backend))
+
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the
+    # forwarded address rather than the proxy's
+    return request.client.host if request.client else "unknown"
+
+
+# Route dependencies: they run before the handler, so a rejected request
+# never reaches bcrypt or the database
+def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    rate_limiter.hit("login:ip", client_ip(request), settings.login_rate_per_ip)
+    # Per targeted account, so a distributed attack on one user is capped too
+    rate_limiter.hit("login:account", form_data.username.lower(), settings.login_rate_per_account)
+
+
+def check_purchase(request: Request, user: User):
+    rate_limiter.hit("purchase:ip", client_ip(request), settings.purchase_rate_per_ip)
+    rate_limiter.hit("purchase:user", user.id, settings.purchase_rate_per_user)
+
+
+def limit_purchase(request: Request, current_user: User = Depends(get_current_user)):
+    check_purchase(request, current_user)
+
+
+async def limit_purchase_async(request: Request, current_user: User = Depends(get_current_user_async)):
+    if isinstance(rate_limiter.backend, MemoryBuckets):
+        check_purchase(request, current_user)
+    else:
+        # Redis round trips would block the event loop
+        await run_in_threadpool(check_purchase, request, current_user)
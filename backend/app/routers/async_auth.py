@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.schemas import UserCreate, UserResponse, Token
+from app.routers.auth import register_user, login_user
+from app.rate_limit import limit_login
+
+# async_db counterpart of routers/auth.py
+router = APIRouter(prefix="/api/auth", tags=["auth"])
+
+
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await register_user(user, db.run_sync)
+
+
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_login)])
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await login_user(form_data, db.run_sync)
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import User
+from app.schemas import (
+    SweetResponse, RestockRequest, PurchaseRequest, BatchPurchaseRequest, BatchRestockRequest, RestockOutcome
+)
+from app.utils import get_current_user_async, get_current_admin_async
+from app.routers import inventory
+from app.rate_limit import limit_purchase_async
+from typing import List
+
+# async_db counterpart of routers/inventory.py; see routers/async_sweets.py
+router = APIRouter(prefix="/api/sweets", tags=["inventory"])
+
+
+@router.post("/{sweet_id}/purchase", response_model=SweetResponse, dependencies=[Depends(limit_purchase_async)])
+async def purchase_sweet(
+    sweet_id: int,
+    purchase: PurchaseRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: inventory.purchase_sweet(
+            sweet_id=sweet_id, purchase=purchase, db=session, current_user=current_user
+        )
+    )
+
+
+@router.post("/purchase/batch", response_model=List[SweetResponse], dependencies=[Depends(limit_purchase_async)])
+async def purchase_sweets_batch(
+    purchase: BatchPurchaseRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: inventory.purchase_sweets_batch(
+            purchase=purchase, db=session, current_user=current_user
+        )
+    )
+
+
+@router.post("/{sweet_id}/restock", response_model=SweetResponse)
+async def restock_sweet(
+    sweet_id: int,
+    restock: RestockRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_admin_async)
+):
+    return await db.run_sync(
+        lambda session: inventory.restock_sweet(
+            sweet_id=sweet_id, restock=restock, db=session, current_user=current_user
+        )
+    )
+
+
+@router.post("/restock/batch", response_model=List[RestockOutcome])
+async def restock_sweets_batch(
+    restock: BatchRestockRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_admin_async)
+):
+    return await db.run_sync(
+        lambda session: inventory.restock_sweets_batch(
+            restock=restock, db=session, current_user=current_user
+        )
+    )
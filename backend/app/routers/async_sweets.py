@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import User
+from app.schemas import SweetCreate, SweetResponse, Facets
+from app.utils import get_current_user_async, get_current_admin_async
+from app.routers import sweets
+from typing import List, Optional
+
+# async_db counterpart of routers/sweets.py. Each handler runs the sync
+# implementation through AsyncSession.run_sync, so its queries go over the
+# async driver and never block the event loop.
+router = APIRouter(prefix="/api/sweets", tags=["sweets"])
+
+
+@router.post("/create", response_model=SweetResponse)
+async def create_sweet(
+    sweet: SweetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: sweets.create_sweet(sweet=sweet, db=session, current_user=current_user)
+    )
+
+
+@router.put("", response_model=SweetResponse)
+async def upsert_sweet(
+    sweet: SweetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: sweets.upsert_sweet(sweet=sweet, db=session, current_user=current_user)
+    )
+
+
+@router.put("/{sweet_id}", response_model=SweetResponse)
+async def update_sweet(
+    sweet_id: int,
+    sweet: SweetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: sweets.update_sweet(
+            sweet_id=sweet_id, sweet=sweet, db=session, current_user=current_user
+        )
+    )
+
+
+@router.get("", response_model=List[SweetResponse])
+async def get_sweets(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None),
+    sort: str = Query("id", pattern="^(id|name|price)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: sweets.get_sweets(
+            request=request, skip=skip, limit=limit, cursor=cursor, sort=sort,
+            db=session, current_user=current_user,
+        )
+    )
+
+
+@router.get("/search", response_model=List[SweetResponse])
+async def search_sweets(
+    request: Request,
+    name: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None),
+    max_price: Optional[float] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: sweets.search_sweets(
+            request=request, name=name, category=category, min_price=min_price,
+            max_price=max_price, limit=limit, db=session, current_user=current_user,
+        )
+    )
+
+
+@router.delete("/{sweet_id}")
+async def delete_sweet(
+    sweet_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_admin_async)
+):
+    return await db.run_sync(
+        lambda session: sweets.delete_sweet(sweet_id=sweet_id, db=session, current_user=current_user)
+    )
+
+
+@router.get("/facets", response_model=Facets)
+async def get_facets(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return await db.run_sync(
+        lambda session: sweets.get_facets(request=request, db=session, current_user=current_user)
+    )
+
+
+@router.get("/{sweet_id}", response_model=SweetResponse)
+async def get_sweet(
+    request: Request,
+    sweet_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return await db.run_sync(
+        lambda session: sweets.get_sweet(
+            request=request, sweet_id=sweet_id, db=session, current_user=current_user
+        )
+    )
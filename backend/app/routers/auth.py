@@ -1,24 +1,49 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
 from app.models import User
 from app.schemas import UserCreate, UserResponse, UserLogin
-from app.utils import get_password_hash
+from app.password_pool import hash_password, check_password
 
 from app.schemas import Token
-from app.utils import verify_password, create_access_token
+from app.utils import create_access_token
+from app.utils import get_current_admin, token_cache, user_cache
+from app.catalog_cache import catalog_cache
+from app.rate_limit import limit_login
 from fastapi.security import OAuth2PasswordRequestForm
 
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
-@router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+def find_user(db: Session, email: str, username: str = None):
+    criteria = User.email == email
+    if username is not None:
+        criteria = criteria | (User.username == username)
+    db_user = db.query(User).filter(criteria).first()
+    # Hand the connection back to the pool before the slow bcrypt step
+    db.close()
+    return db_user
+
+
+def save_user(db: Session, db_user: User):
+    db.add(db_user)
+    db.commit()
+    return db_user
+
+
+# The register/login flows take run_db(fn, *args), which awaits fn(db, *args)
+# off the event loop: on the threadpool for the sync engine, through
+# AsyncSession.run_sync for the async one. bcrypt runs on the password
+# pool, so neither holds a threadpool thread while hashing.
+def threadpool_runner(db: Session):
+    return lambda fn, *args: run_in_threadpool(fn, db, *args)
+
+
+async def register_user(user: UserCreate, run_db):
     # Check if user exists
-    db_user = db.query(User).filter(
-        (User.email == user.email) | (User.username == user.username)
-    ).first()
+    db_user = await run_db(find_user, user.email, user.username)
     
     if db_user:
         raise HTTPException(
@@ -27,30 +52,20 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return db_user
+    return await run_db(save_user, db_user)
 
 
-@router.post("/login", response_model=Token)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
-):
-    db_user = db.query(User).filter(
-        User.email == form_data.username
-    ).first()
+async def login_user(form_data: OAuth2PasswordRequestForm, run_db):
+    db_user = await run_db(find_user, form_data.username)
 
-    if not db_user or not verify_password(form_data.password, db_user.hashed_password):
+    if not db_user or not await check_password(form_data.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -58,4 +73,26 @@ def login(
         )
 
     access_token = create_access_token(data={"sub": db_user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    return await register_user(user, threadpool_runner(db))
+
+
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_login)])
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+):
+    return await login_user(form_data, threadpool_runner(db))
+
+
+@router.get("/cache/stats")
+def cache_stats(current_user: User = Depends(get_current_admin)):
+    return {
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "catalog": catalog_cache.stats(),
+    }
\ No newline at end of file
@@ -0,0 +1,217 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, get_db, upsert_insert
+from app.models import Sweet, User
+from app.schemas import SweetCreate, ImportResult, ImportRowError
+from app.utils import get_current_admin
+from app import facets, search, write_behind
+from app.catalog_cache import catalog_cache
+from typing import Optional
+import csv
+import io
+import json
+import tempfile
+
+router = APIRouter(prefix="/api/sweets", tags=["bulk"])
+
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_COLUMNS = ("id", "name", "category", "price", "quantity")
+UPDATE_COLUMNS = ("category", "price", "quantity")
+
+# Uploads larger than this spill from memory to a temporary file
+SPOOL_SIZE = 4 * 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+
+
+def read_rows(stream, fmt):
+    """Yield (line, SweetCreate or None, error) for each record in the upload."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        records = ((reader.line_num, row, None) for row in reader)
+    else:
+        records = (parse_json_line(number, line) for number, line in enumerate(stream, 1) if line.strip())
+    for line, record, error in records:
+        if error is None:
+            try:
+                yield line, SweetCreate.model_validate(record), None
+                continue
+            except ValidationError as e:
+                first = e.errors()[0]
+                error = f"{'.'.join(str(part) for part in first['loc']) or 'row'}: {first['msg']}"
+        yield line, None, error
+
+
+def parse_json_line(number, line):
+    try:
+        return number, json.loads(line), None
+    except ValueError as e:
+        return number, None, f"Invalid JSON: {e}"
+
+
+def write_chunk(db: Session, chunk: dict, on_conflict: str):
+    """Upsert one chunk of sweets keyed by name; returns the rows written."""
+    names = list(chunk)
+    # name -> current (category, price, quantity), for the facet stats;
+    # locked so the upsert below overwrites exactly these values
+    existing = {
+        name: (category, price, quantity)
+        for name, category, price, quantity in db.execute(
+            select(Sweet.name, Sweet.category, Sweet.price, Sweet.quantity)
+            .where(Sweet.name.in_(names))
+            .with_for_update()
+        )
+    }
+    if on_conflict == "skip":
+        names = [name for name in names if name not in existing]
+        if not names:
+            return [], existing
+
+    # One statement executed with many parameter sets compiles once and is
+    # sent as batched multi-row VALUES ("insertmanyvalues")
+    insert = upsert_insert(db.get_bind())
+    stmt = insert(Sweet.__table__)
+    if on_conflict == "update":
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Sweet.name],
+            set_={column: stmt.excluded[column] for column in UPDATE_COLUMNS},
+        )
+    else:
+        # Another writer may have added the name since the lookup above
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Sweet.name])
+    stmt = stmt.returning(Sweet.id, Sweet.name, Sweet.category, Sweet.price, Sweet.quantity)
+    rows = db.connection().execute(stmt, [chunk[name] for name in names]).all()
+    return rows, existing
+
+
+def import_rows(db: Session, rows, on_conflict: str) -> ImportResult:
+    result = ImportResult()
+    written = []
+    updated_ids = []
+    changes = []
+
+    def flush(chunk):
+        rows, existing = write_chunk(db, chunk, on_conflict)
+        written.extend(rows)
+        for row in rows:
+            changes.append((existing.get(row.name), facets.facet_values(row)))
+            if row.name in existing:
+                result.updated += 1
+                updated_ids.append(row.id)
+            else:
+                result.inserted += 1
+
+    chunk = {}
+    received = 0
+    # Updated quantities replace the stored ones, so purchases wait for the
+    # import rather than be taken off the new values
+    with write_behind.stock.overwriting():
+        for line, sweet, error in rows:
+            if error is not None:
+                result.invalid += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append(ImportRowError(line=line, detail=error))
+                continue
+            received += 1
+            # A name repeated within a chunk can only be written once per
+            # statement; the last occurrence wins
+            chunk[sweet.name] = sweet.model_dump()
+            if len(chunk) >= settings.bulk_chunk_size:
+                flush(chunk)
+                chunk = {}
+        if chunk:
+            flush(chunk)
+
+        db.commit()
+    result.skipped = received - result.inserted - result.updated
+
+    for previous, current in changes:
+        facets.stats.record(previous, current)
+
+    for row in written:
+        search.index_sweet(row)
+    if written:
+        catalog_cache.invalidate(*updated_ids)
+    return result
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_sweets(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    on_conflict: str = Query("update", pattern="^(update|skip)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = format or IMPORT_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format="
+        )
+
+    # Spool the body as it arrives, then parse and insert it a chunk at a
+    # time so memory stays flat however large the catalog is
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as upload:
+        async for data in request.stream():
+            upload.write(data)
+        upload.seek(0)
+        text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+        try:
+            return await run_in_threadpool(import_rows, db, read_rows(text, fmt), on_conflict)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not read import: {e}"
+            )
+
+
+def export_rows(fmt: str):
+    # The response outlives the request's dependencies, so the stream
+    # owns its session
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            select(*(getattr(Sweet, column) for column in EXPORT_COLUMNS))
+            .order_by(Sweet.id)
+            .execution_options(yield_per=settings.bulk_chunk_size)
+        )
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            yield ",".join(EXPORT_COLUMNS) + "\r\n"
+            for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows
+                )
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_sweets(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(get_current_admin)
+):
+    return StreamingResponse(
+        export_rows(format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="sweets.{format}"'},
+    )
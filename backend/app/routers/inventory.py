@@ -1,18 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import case, update
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from app.database import get_db
 from app.models import Sweet, User
 from app.schemas import SweetResponse
-from app.schemas import SweetResponse,RestockRequest,PurchaseRequest
+from app.schemas import SweetResponse,RestockRequest,PurchaseRequest,BatchPurchaseRequest,BatchRestockRequest,RestockOutcome
+from typing import List
 from app.utils import get_current_user,get_current_admin
+from app.catalog_cache import catalog_cache
+from app.config import settings
+from app import facets, write_behind
+from app.write_behind import add_stock_statement
+from app.rate_limit import limit_purchase
 
 router = APIRouter(prefix="/api/sweets", tags=["inventory"])
 
 class PurchaseRequest(BaseModel):
     quantity: int
 
-@router.post("/{sweet_id}/purchase", response_model=SweetResponse)
+@router.post("/{sweet_id}/purchase", response_model=SweetResponse, dependencies=[Depends(limit_purchase)])
 def purchase_sweet(
     sweet_id: int,
     purchase: PurchaseRequest,
@@ -25,26 +32,120 @@ def purchase_sweet(
             detail="Quantity must be positive"
         )
     
-    db_sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    if settings.purchase_write_behind:
+        # Reserved from in-memory stock; the database catches up in batches
+        try:
+            return write_behind.stock.reserve({sweet_id: purchase.quantity}, db)[0]
+        except write_behind.SweetNotFound:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sweet not found"
+            )
+        except write_behind.OutOfStock:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Not enough stock available"
+            )
+    
+    # Check and decrement in a single statement so concurrent buyers
+    # can't both pass the stock check and oversell the same row
+    db_sweet = db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet_id, Sweet.quantity >= purchase.quantity)
+        .values(quantity=Sweet.quantity - purchase.quantity)
+        .returning(*Sweet.__table__.c)
+        .execution_options(synchronize_session=False)
+    ).mappings().first()
     
     if not db_sweet:
+        db.rollback()
+        if not db.query(Sweet.id).filter(Sweet.id == sweet_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sweet not found"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Sweet not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough stock available"
         )
     
-    if db_sweet.quantity < purchase.quantity:
+    db.commit()
+    facets.stats.add_stock({db_sweet["category"]: -purchase.quantity})
+    catalog_cache.invalidate(sweet_id)
+    
+    return db_sweet
+
+@router.post("/purchase/batch", response_model=List[SweetResponse], dependencies=[Depends(limit_purchase)])
+def purchase_sweets_batch(
+    purchase: BatchPurchaseRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not purchase.items:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Not enough stock available"
+            detail="No items to purchase"
+        )
+    
+    # Merge repeated sweets so each row is decremented once
+    totals = {}
+    for item in purchase.items:
+        if item.quantity <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Quantity must be positive"
+            )
+        totals[item.sweet_id] = totals.get(item.sweet_id, 0) + item.quantity
+    
+    if settings.purchase_write_behind:
+        try:
+            return write_behind.stock.reserve(totals, db)
+        except write_behind.SweetNotFound as e:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Sweet {e.sweet_id} not found"
+            )
+        except write_behind.OutOfStock as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Not enough stock available for sweet {e.sweet_id}"
+            )
+    
+    # One UPDATE for the whole cart; rows short on stock don't match
+    wanted = case(totals, value=Sweet.id)
+    rows = db.execute(
+        update(Sweet)
+        .where(Sweet.id.in_(totals), Sweet.quantity >= wanted)
+        .values(quantity=Sweet.quantity - wanted)
+        .returning(*Sweet.__table__.c)
+        .execution_options(synchronize_session=False)
+    ).mappings().all()
+    
+    if len(rows) != len(totals):
+        db.rollback()
+        updated = {row["id"] for row in rows}
+        found = {
+            sweet_id for (sweet_id,) in
+            db.query(Sweet.id).filter(Sweet.id.in_(totals)).all()
+        }
+        missing = sorted(set(totals) - found)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Sweet {missing[0]} not found"
+            )
+        short = sorted(set(totals) - updated)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Not enough stock available for sweet {short[0]}"
         )
     
-    # Update quantity
-    db_sweet.quantity -= purchase.quantity
     db.commit()
-    db.refresh(db_sweet)
+    facets.stats.add_stock(facets.stock_deltas(rows, totals, -1))
+    catalog_cache.invalidate(*totals)
     
-    return db_sweet
+    by_id = {row["id"]: row for row in rows}
+    return [by_id[sweet_id] for sweet_id in totals]
 
 @router.post("/{sweet_id}/restock", response_model=SweetResponse)
 def restock_sweet(
@@ -59,16 +160,68 @@ def restock_sweet(
             detail="Quantity must be positive"
         )
     
-    db_sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    # Increment in SQL: a read-modify-write here would overwrite purchases
+    # committed between the read and the write
+    db_sweet = db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet_id)
+        .values(quantity=Sweet.quantity + restock.quantity)
+        .returning(*Sweet.__table__.c)
+        .execution_options(synchronize_session=False)
+    ).mappings().first()
     
     if not db_sweet:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
     
-    db_sweet.quantity += restock.quantity
     db.commit()
-    db.refresh(db_sweet)
+    facets.stats.add_stock({db_sweet["category"]: restock.quantity})
+    write_behind.stock.restocked({sweet_id: restock.quantity})
+    catalog_cache.invalidate(sweet_id)
+    
+    return db_sweet
+
+@router.post("/restock/batch", response_model=List[RestockOutcome])
+def restock_sweets_batch(
+    restock: BatchRestockRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    if not restock.items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No items to restock"
+        )
+    
+    totals = {}
+    for item in restock.items:
+        if item.quantity <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Quantity must be positive"
+            )
+        totals[item.sweet_id] = totals.get(item.sweet_id, 0) + item.quantity
+    
+    # Unknown ids simply don't match; everything else lands in one commit
+    rows = db.execute(
+        add_stock_statement(db, totals)
+        .returning(Sweet.id, Sweet.category, Sweet.quantity)
+        .execution_options(synchronize_session=False)
+    ).mappings().all()
+    db.commit()
+    facets.stats.add_stock(facets.stock_deltas(rows, totals))
+    
+    restocked = {row["id"]: row["quantity"] for row in rows}
+    if restocked:
+        write_behind.stock.restocked({sweet_id: totals[sweet_id] for sweet_id in restocked})
+        catalog_cache.invalidate(*restocked)
     
-    return db_sweet
\ No newline at end of file
+    return [
+        {"sweet_id": sweet_id, "status": "restocked", "quantity": restocked[sweet_id]}
+        if sweet_id in restocked else
+        {"sweet_id": sweet_id, "status": "not_found"}
+        for sweet_id in totals
+    ]
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, status
+from app.models import User
+from app.profiling import profiler
+from app.utils import get_current_admin
+
+router = APIRouter(prefix="/api/profiling", tags=["profiling"])
+
+
+@router.get("/sql")
+def sql_summary(top: int = 20, current_user: User = Depends(get_current_admin)):
+    return profiler.summary(top)
+
+
+@router.delete("/sql", status_code=status.HTTP_204_NO_CONTENT)
+def reset_sql_summary(current_user: User = Depends(get_current_admin)):
+    profiler.reset()
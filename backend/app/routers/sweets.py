@@ -1,27 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, status,Query
+from fastapi import APIRouter, Depends, HTTPException, status,Query,Request
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, upsert_insert
 from app.models import Sweet, User
-from app.schemas import SweetCreate, SweetResponse
+from app.schemas import SweetCreate, SweetResponse, Facets
 from app.utils import get_current_user,get_current_admin
+from app import facets, search, write_behind
+from app.catalog_cache import catalog_cache, not_modified
+from app.metrics import SERIALIZE_SECONDS
+from app.serialization import SWEET_COLUMNS, dump_sweets
 from typing import List,Optional
+import base64
+import json
 
 router = APIRouter(prefix="/api/sweets", tags=["sweets"])
 
+SORT_COLUMNS = {"id": Sweet.id, "name": Sweet.name, "price": Sweet.price}
+# JSON types a cursor's value may have for each sort column
+CURSOR_TYPES = {"id": int, "name": str, "price": (int, float)}
+
+def to_json_list(sweets) -> bytes:
+    with SERIALIZE_SECONDS.time(kind="sweet_list"):
+        return dump_sweets(sweets)
+
+
+def encode_cursor(sort: str, sweet: Sweet) -> str:
+    raw = json.dumps([sort, getattr(sweet, sort), sweet.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        cursor_sort = None
+    # Both end up bound into the keyset comparison, so a forged cursor
+    # mustn't reach the database with the wrong types
+    if (
+        cursor_sort != sort
+        or not isinstance(value, CURSOR_TYPES[sort]) or isinstance(value, bool)
+        or not isinstance(last_id, int) or isinstance(last_id, bool)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return value, last_id
+
+def duplicate_name():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Sweet with this name already exists"
+    )
+
 @router.post("/create", response_model=SweetResponse)
 def create_sweet(
     sweet: SweetCreate, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_sweet = db.query(Sweet).filter(Sweet.name == sweet.name).first()
-    
-    if db_sweet:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Sweet with this name already exists"
-        )
-    
     db_sweet = Sweet(
         name=sweet.name,
         category=sweet.category,
@@ -29,70 +68,170 @@ def create_sweet(
         quantity=sweet.quantity
     )
     
+    # The unique constraint on sweets.name decides duplicates, so two
+    # concurrent creators can't both get in
     db.add(db_sweet)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise duplicate_name()
     db.commit()
-    db.refresh(db_sweet)
+    facets.stats.record(None, facets.facet_values(db_sweet))
+    search.index_sweet(db_sweet)
+    catalog_cache.invalidate()
     
     return db_sweet
 
+def update_with_previous(db: Session, where, values: dict):
+    """UPDATE the sweets matching ``where`` in one statement.
+
+    Returns the first row as (sweet as written, previous category, previous
+    price, previous quantity), or None when nothing matched.
+    """
+    columns = (Sweet.id, Sweet.category, Sweet.price, Sweet.quantity)
+    if db.get_bind().dialect.name == "postgresql":
+        # The locked sub-select in FROM reads the row before the UPDATE
+        # changes it, and RETURNING may name its columns
+        old = select(*columns).where(where).with_for_update().subquery("old")
+        stmt = update(Sweet).where(Sweet.id == old.c.id)
+        previous = [old.c.category, old.c.price, old.c.quantity]
+    else:
+        # SQLite's RETURNING can't name FROM tables; a materialized CTE is
+        # read before the UPDATE runs
+        old = select(*columns).where(where).cte("old").prefix_with("MATERIALIZED")
+        stmt = update(Sweet).where(Sweet.id.in_(select(old.c.id)))
+        previous = [
+            select(column).where(old.c.id == Sweet.id).correlate(Sweet).scalar_subquery()
+            for column in (old.c.category, old.c.price, old.c.quantity)
+        ]
+    return db.execute(
+        stmt.values(**values)
+        .returning(Sweet, *previous)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+@router.put("", response_model=SweetResponse)
+def upsert_sweet(
+    sweet: SweetCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create the sweet, or overwrite the one with the same name."""
+    values = sweet.model_dump()
+    insert = upsert_insert(db.get_bind())
+    # The sweet's id isn't known before the write, so purchases of every
+    # sweet wait for it
+    with write_behind.stock.overwriting():
+        while True:
+            row = update_with_previous(db, Sweet.name == sweet.name, values)
+            if row is not None:
+                db_sweet, previous = row[0], tuple(row[1:])
+                break
+            db_sweet = db.execute(
+                insert(Sweet).values(**values)
+                .on_conflict_do_nothing(index_elements=[Sweet.name])
+                .returning(Sweet)
+            ).scalar_one_or_none()
+            if db_sweet is not None:
+                previous = None
+                break
+            # Created by someone else since the UPDATE; overwrite theirs
+        db.commit()
+    facets.stats.record(previous, facets.facet_values(db_sweet))
+    search.index_sweet(db_sweet)
+    catalog_cache.invalidate(db_sweet.id)
+    return db_sweet
+
 @router.put("/{sweet_id}", response_model=SweetResponse)
 def update_sweet(sweet_id: int,sweet: SweetCreate,db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
-    db_sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
-    
-    if not db_sweet:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="Sweet not found")
-    
-    if sweet.name != db_sweet.name:
-        existing_sweet = db.query(Sweet).filter(Sweet.name == sweet.name).first()
-        if existing_sweet:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Sweet with this name already exists"
-            )
-    
-    db_sweet.name = sweet.name
-    db_sweet.category = sweet.category
-    db_sweet.price = sweet.price
-    db_sweet.quantity = sweet.quantity
-    
-    db.commit()
-    db.refresh(db_sweet)
-    return db_sweet
+    # The updated row comes back from the UPDATE itself, along with what
+    # the facet stats need from before
+    with write_behind.stock.overwriting(sweet_id):
+        try:
+            row = update_with_previous(db, Sweet.id == sweet_id, sweet.model_dump())
+        except IntegrityError:
+            db.rollback()
+            raise duplicate_name()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="Sweet not found")
 
-    
+        db_sweet = row[0]
+        db.commit()
+    facets.stats.record(tuple(row[1:]), facets.facet_values(db_sweet))
+    search.index_sweet(db_sweet)
+    catalog_cache.invalidate(sweet_id)
+    return db_sweet
 
 
 @router.get("", response_model=List[SweetResponse])
 def get_sweets(
+    request: Request,
     skip: int = 0, 
     limit: int = 100,
+    cursor: Optional[str] = Query(None),
+    sort: str = Query("id", pattern="^(id|name|price)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user) 
 ):
-    sweets = db.query(Sweet).offset(skip).limit(limit).all()
-    return sweets
+    # Served from the catalog cache until a write handler invalidates it
+    key = catalog_cache.list_key("sweets", skip=skip, limit=limit, cursor=cursor, sort=sort)
+    etag = catalog_cache.list_etag(key)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    column = SORT_COLUMNS[sort]
+    if sort == "id":
+        query = db.query(*SWEET_COLUMNS).order_by(Sweet.id)
+    else:
+        query = db.query(*SWEET_COLUMNS).order_by(column, Sweet.id)
+    
+    # Keyset mode: seek past the last row of the previous page instead of
+    # scanning and discarding skip rows
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if sort == "id":
+            query = query.filter(Sweet.id > last_id)
+        else:
+            query = query.filter(tuple_(column, Sweet.id) > tuple_(value, last_id))
+    else:
+        query = query.offset(skip)
+    
+    sweets = query.limit(limit).all()
+    
+    headers = {"ETag": etag}
+    if sweets and len(sweets) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(sort, sweets[-1])
+    return catalog_cache.store(key, to_json_list(sweets), headers)
 
 @router.get("/search", response_model=List[SweetResponse])
 def search_sweets(
+    request: Request,
     name: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Sweet)
+    params = dict(name=name, category=category, min_price=min_price, max_price=max_price, limit=limit)
+    key = catalog_cache.list_key("search", **params)
+    etag = catalog_cache.list_etag(key)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
     
-    if name:
-        query = query.filter(Sweet.name.ilike(f"%{name}%"))
-    if category:
-        query = query.filter(Sweet.category.ilike(f"%{category}%"))
-    if min_price is not None:
-        query = query.filter(Sweet.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Sweet.price <= max_price)
-    
-    return query.all()
+    # Ranked, index-backed lookup; see app/search.py for the backends
+    sweets = search.search_sweets(db, **params)
+    return catalog_cache.store(key, to_json_list(sweets), {"ETag": etag})
 
 
 @router.delete("/{sweet_id}")
@@ -101,29 +240,72 @@ def delete_sweet(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
-    db_sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    previous = db.execute(
+        delete(Sweet)
+        .where(Sweet.id == sweet_id)
+        .returning(Sweet.category, Sweet.price, Sweet.quantity)
+        .execution_options(synchronize_session=False)
+    ).first()
     
-    if not db_sweet:
+    if not previous:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
     
-    db.delete(db_sweet)
     db.commit()
+    facets.stats.record(tuple(previous), None)
+    search.unindex_sweet(sweet_id)
+    write_behind.stock.forget(sweet_id)
+    catalog_cache.invalidate(sweet_id)
     
     return {"message": "Sweet deleted successfully"}
 
+@router.get("/facets", response_model=Facets)
+def get_facets(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Per-category counts and price ranges from the maintained stats table,
+    # so the cost follows the number of categories, not of sweets
+    key = catalog_cache.list_key("facets")
+    etag = catalog_cache.list_etag(key)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    body = Facets.model_validate(facets.load(db)).model_dump_json()
+    return catalog_cache.store(key, body, {"ETag": etag})
+
 @router.get("/{sweet_id}", response_model=SweetResponse)
 def get_sweet(
+    request: Request,
     sweet_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    # Read the version before the row: a write committing in between then
+    # leaves this response under a key nobody reads again
+    version = catalog_cache.sweet_version(sweet_id)
+    etag = catalog_cache.sweet_etag(sweet_id, version)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    key = catalog_cache.sweet_key(sweet_id, version)
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
+    
     sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
     if not sweet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
-    return sweet
\ No newline at end of file
+    with SERIALIZE_SECONDS.time(kind="sweet"):
+        body = SweetResponse.model_validate(sweet).model_dump_json()
+    return catalog_cache.store(key, body, {"ETag": etag})
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 
 class UserCreate(BaseModel):
     username: str
@@ -38,4 +38,49 @@ class RestockRequest(BaseModel):
     quantity: int
 
 class PurchaseRequest(BaseModel):
-    quantity: int
\ No newline at end of file
+    quantity: int
+
+class PurchaseItem(BaseModel):
+    sweet_id: int
+    quantity: int
+
+class BatchPurchaseRequest(BaseModel):
+    items: List[PurchaseItem]
+
+class RestockItem(BaseModel):
+    sweet_id: int
+    quantity: int
+
+class BatchRestockRequest(BaseModel):
+    items: List[RestockItem]
+
+class RestockOutcome(BaseModel):
+    sweet_id: int
+    status: str
+    quantity: Optional[int] = None
+
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+class ImportResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    errors: List[ImportRowError] = []
+
+class CategoryFacet(BaseModel):
+    category: str
+    sweets: int
+    in_stock: int
+    min_price: float
+    max_price: float
+    avg_price: float
+
+class Facets(BaseModel):
+    categories: List[CategoryFacet]
+    sweets: int
+    in_stock: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
@@ -0,0 +1,232 @@
+import threading
+from collections import defaultdict
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.invalidation import broadcaster
+from app.models import Sweet
+from app.serialization import SWEET_COLUMNS
+
+# On PostgreSQL with pg_trgm, ILIKE '%term%' is served by these GIN indexes
+# instead of a sequential scan, and similarity() gives a ranking.
+TRIGRAM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_sweets_name_trgm ON sweets USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_sweets_category_trgm ON sweets USING gin (category gin_trgm_ops)",
+]
+
+FIELDS = ("name", "category")
+
+# Resolved on the first search, see active_backend()
+backend = None
+
+
+def trigrams(value: str) -> set:
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class NgramIndex:
+    """In-process trigram index over sweet names and categories.
+
+    Used when the database can't provide trigram indexes (SQLite test runs,
+    or PostgreSQL without pg_trgm). It is loaded from the sweets table on
+    first use and then kept current by the write handlers.
+    """
+
+    def __init__(self):
+        self._docs = {}
+        self._postings = defaultdict(set)
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        with self._lock:
+            if self._loaded:
+                return
+            for sweet_id, name, category in db.query(Sweet.id, Sweet.name, Sweet.category):
+                self._add(sweet_id, name, category)
+            self._loaded = True
+
+    def _add(self, sweet_id, name, category):
+        doc = {"name": (name or "").lower(), "category": (category or "").lower()}
+        self._docs[sweet_id] = doc
+        for field in FIELDS:
+            for gram in trigrams(doc[field]):
+                self._postings[(field, gram)].add(sweet_id)
+
+    def _remove(self, sweet_id):
+        doc = self._docs.pop(sweet_id, None)
+        if doc is None:
+            return
+        for field in FIELDS:
+            for gram in trigrams(doc[field]):
+                postings = self._postings.get((field, gram))
+                if postings is not None:
+                    postings.discard(sweet_id)
+                    if not postings:
+                        del self._postings[(field, gram)]
+
+    def add(self, sweet_id, name, category):
+        with self._lock:
+            if self._loaded:
+                self._remove(sweet_id)
+                self._add(sweet_id, name, category)
+
+    def remove(self, sweet_id):
+        with self._lock:
+            if self._loaded:
+                self._remove(sweet_id)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._loaded = False
+
+    def match(self, **terms) -> dict:
+        """Map ids whose fields contain every given term to a relevance score."""
+        with self._lock:
+            candidates = None
+            for field, term in terms.items():
+                term = term.lower()
+                grams = trigrams(term)
+                if grams:
+                    postings = sorted(
+                        (self._postings.get((field, gram), set()) for gram in grams),
+                        key=len,
+                    )
+                    ids = set(postings[0]).intersection(*postings[1:])
+                else:
+                    ids = set(self._docs)
+                if candidates is not None:
+                    ids &= candidates
+                # Trigrams only narrow the set; confirm the substring match
+                candidates = {i for i in ids if term in self._docs[i][field]}
+            # Every candidate contains the term, so rank by how much of the
+            # field it covers; exact matches score 1 per field
+            return {
+                sweet_id: sum(
+                    len(term) / len(self._docs[sweet_id][field])
+                    for field, term in terms.items()
+                )
+                for sweet_id in candidates or ()
+            }
+
+
+ngram_index = NgramIndex()
+
+
+def setup_search(engine) -> str:
+    """Create the trigram indexes if the database supports them.
+
+    Run by the bootstrap step; returns the backend searches will use.
+    """
+    global backend
+    backend = "ngram"
+    if settings.search_backend != "ngram" and engine.dialect.name == "postgresql":
+        try:
+            with engine.begin() as conn:
+                for ddl in TRIGRAM_DDL:
+                    conn.execute(text(ddl))
+            backend = "trigram"
+        except DBAPIError:
+            if settings.search_backend == "trigram":
+                raise
+    return backend
+
+
+def active_backend(db: Session) -> str:
+    """Trigram if bootstrap managed to install pg_trgm, checked once per process."""
+    global backend
+    if backend is None:
+        found = "ngram"
+        if settings.search_backend != "ngram" and db.get_bind().dialect.name == "postgresql":
+            if db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first():
+                found = "trigram"
+        backend = found
+    return backend
+
+
+def index_sweet(sweet):
+    ngram_index.add(sweet.id, sweet.name, sweet.category)
+    if backend != "trigram":
+        broadcaster.publish("search", sweet.id, [sweet.name, sweet.category])
+
+
+def unindex_sweet(sweet_id: int):
+    ngram_index.remove(sweet_id)
+    if backend != "trigram":
+        broadcaster.publish("search", sweet_id)
+
+
+def _indexed_elsewhere(items):
+    if items is None:
+        # Reloaded from the table on the next search
+        ngram_index.clear()
+        return
+    for sweet_id, fields in items.items():
+        if fields is None:
+            ngram_index.remove(sweet_id)
+        else:
+            ngram_index.add(sweet_id, *fields)
+
+
+broadcaster.register("search", _indexed_elsewhere)
+
+
+def contains_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def apply_price_range(query, min_price, max_price):
+    if min_price is not None:
+        query = query.filter(Sweet.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Sweet.price <= max_price)
+    return query
+
+
+def search_sweets(
+    db: Session,
+    name: str = None,
+    category: str = None,
+    min_price: float = None,
+    max_price: float = None,
+    limit: int = 50,
+):
+    terms = {field: term for field, term in (("name", name), ("category", category)) if term}
+    # Plain rows, not ORM objects; see app/serialization.py
+    query = apply_price_range(db.query(*SWEET_COLUMNS), min_price, max_price)
+
+    if not terms:
+        return query.order_by(Sweet.id).limit(limit).all()
+
+    if active_backend(db) == "trigram":
+        rank = None
+        for field, term in terms.items():
+            column = getattr(Sweet, field)
+            query = query.filter(column.ilike(contains_pattern(term), escape="\\"))
+            score = func.similarity(column, term)
+            rank = score if rank is None else rank + score
+        return query.order_by(rank.desc(), Sweet.id).limit(limit).all()
+
+    ngram_index.load(db)
+    scores = ngram_index.match(**terms)
+    ranked = sorted(scores, key=lambda sweet_id: (-scores[sweet_id], sweet_id))
+
+    # Price filters still run in the database; fetch ranked ids in chunks
+    # until the page is full
+    results = []
+    chunk = max(limit * 4, 100)
+    for start in range(0, len(ranked), chunk):
+        ids = ranked[start:start + chunk]
+        rows = {sweet.id: sweet for sweet in query.filter(Sweet.id.in_(ids))}
+        results.extend(rows[sweet_id] for sweet_id in ids if sweet_id in rows)
+        if len(results) >= limit:
+            break
+    return results[:limit]
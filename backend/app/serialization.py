@@ -0,0 +1,14 @@
+import orjson
+
+from app.models import Sweet
+from app.schemas import SweetResponse
+
+# Catalog listings select these columns as plain rows and encode them
+# straight to JSON: no ORM objects, identity map or per-row pydantic
+# validation. The fields follow SweetResponse so the output is unchanged.
+SWEET_FIELDS = tuple(SweetResponse.model_fields)
+SWEET_COLUMNS = tuple(getattr(Sweet, field) for field in SWEET_FIELDS)
+
+
+def dump_sweets(rows) -> bytes:
+    return orjson.dumps([dict(zip(SWEET_FIELDS, row)) for row in rows])
@@ -0,0 +1,149 @@
+"""Serve the API from several worker processes.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+The parent does the one-off work before forking: it runs the bootstrap
+step once, so workers never race on DDL, then imports the app and builds
+its OpenAPI schema. Workers inherit all of that copy-on-write and accept
+from one shared listening socket; one that dies is replaced.
+
+With more than one worker, writes are broadcast over the
+invalidation_channel setting ("auto" unless set; see app/invalidation.py)
+and the other workers drop their cached copies when it arrives. That is
+asynchronous: until then (normally milliseconds) they may still serve the
+old data.
+
+Where os.fork is missing, uvicorn's own process manager is used instead
+and each worker imports the app itself.
+"""
+import argparse
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import time
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger("app.serve")
+
+
+def configure(workers: int):
+    """Adjust settings for a multi-worker run, before anything is forked.
+
+    Returns the temporary directory made for the workers' sockets, if any.
+    """
+    # The parent has already bootstrapped
+    settings.bootstrap_on_startup = False
+    os.environ["BOOTSTRAP_ON_STARTUP"] = "false"
+    if workers <= 1:
+        return None
+    if settings.purchase_write_behind:
+        raise SystemExit("purchase_write_behind keeps stock in one process; run it with --workers 1")
+    if settings.invalidation_channel == "none":
+        settings.invalidation_channel = "auto"
+        os.environ["INVALIDATION_CHANNEL"] = "auto"
+    socket_dir = None
+    if not settings.invalidation_socket_dir:
+        # Only this launcher's workers, so other instances on the host
+        # (staging, another test run) don't drop each other's caches
+        socket_dir = tempfile.mkdtemp(prefix="sweetshop-invalidation-")
+        settings.invalidation_socket_dir = socket_dir
+        os.environ["INVALIDATION_SOCKET_DIR"] = socket_dir
+    if settings.rate_limit_enabled and settings.rate_limit_backend == "memory":
+        logger.warning("With rate_limit_backend=memory each worker counts its own requests; "
+                       "use redis to enforce the limits across workers")
+    return socket_dir
+
+
+def warm_up(bootstrap_schema: bool = True):
+    from app import database
+    from app.bootstrap import bootstrap
+    from app.main import app
+
+    if bootstrap_schema:
+        # Also settles the search backend, so workers don't each detect it
+        bootstrap()
+    app.openapi()
+    # Pooled connections must not be shared across fork
+    if database._engine is not None:
+        database._engine.dispose()
+    return app
+
+
+def serve_forked(app, host: str, port: int, workers: int, log_level: str):
+    config = uvicorn.Config(app, host=host, port=port, log_level=log_level)
+    sock = config.bind_socket()
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # uvicorn installs its own handlers once it runs
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info("Started %d workers on http://%s:%d", workers, host, port)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logger.warning("Worker %d exited with status %d; starting another", pid, status)
+            # Don't spin if workers die straight away
+            time.sleep(1)
+            spawn()
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--skip-bootstrap", action="store_true",
+                        help="the schema is created separately (python -m app.bootstrap)")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+
+    socket_dir = configure(args.workers)
+    try:
+        app = warm_up(not args.skip_bootstrap)
+        if hasattr(os, "fork"):
+            serve_forked(app, args.host, args.port, args.workers, args.log_level)
+        else:
+            uvicorn.run("app.main:app", host=args.host, port=args.port,
+                        workers=args.workers, log_level=args.log_level)
+    finally:
+        if socket_dir is not None:
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
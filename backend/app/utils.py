@@ -1,16 +1,41 @@
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from app.database import get_db
-from sqlalchemy.orm import Session
+from app.database import get_db, get_async_db
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+import threading
+import time
 from app.config import settings
+from app.cache import TTLCache
+from app.invalidation import broadcaster
 
 
 from app.models import User
 
+# Resolved users keyed by token subject, so authenticated requests
+# don't pay a users lookup every time
+user_cache = TTLCache(
+    max_size=settings.user_cache_max_size,
+    ttl=settings.user_cache_ttl_seconds,
+)
+
+# Bumped by every user invalidation. A lookup caches what it read only if
+# none happened meanwhile, so a read racing an update or delete can't store
+# the old row after the invalidation has run
+user_generation = 0
+_user_generation_lock = threading.Lock()
+
+# Claims of tokens that already passed signature verification
+token_cache = TTLCache(
+    max_size=settings.token_cache_max_size,
+    ttl=settings.token_cache_ttl_seconds,
+)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 pwd_context = CryptContext(
@@ -39,31 +64,133 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict:
+    if settings.token_cache_enabled:
+        payload = token_cache.get(token)
+        if payload is not None:
+            return payload
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+
+    if settings.token_cache_enabled:
+        # Expire the entry no later than the token itself
+        exp = payload.get("exp")
+        ttl = exp - time.time() if exp is not None else None
+        token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def token_subject(token: str) -> str:
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
+        raise credentials_exception()
+    return username
+
+
+def cached_user(username: str):
+    if settings.user_cache_enabled:
+        return user_cache.get(username)
+    return None
+
+
+def remember_user(db, username: str, user, generation: int):
+    """Cache ``user``, read when user_generation was ``generation``."""
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+
+    if settings.user_cache_enabled:
+        # Detach so the cached copy outlives this request's session
+        db.expunge(user)
+        with _user_generation_lock:
+            if generation == user_generation:
+                user_cache.set(username, user)
     return user
 
+
+# Plain def: FastAPI runs it on the threadpool, so the users lookup on a
+# cache miss doesn't block the event loop
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    username = token_subject(token)
+    user = cached_user(username)
+    if user is not None:
+        return user
+
+    generation = user_generation
+    user = db.query(User).filter(User.username == username).first()
+    return remember_user(db, username, user, generation)
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+):
+    username = token_subject(token)
+    user = cached_user(username)
+    if user is not None:
+        return user
+
+    generation = user_generation
+    result = await db.execute(select(User).where(User.username == username))
+    return remember_user(db, username, result.scalars().first(), generation)
+
+
+def _drop_users(usernames):
+    global user_generation
+    with _user_generation_lock:
+        user_generation += 1
+        if usernames is None:
+            user_cache.clear()
+        else:
+            for username in usernames:
+                user_cache.delete(username)
+
+
+def invalidate_user(username: str):
+    _drop_users([username])
+    broadcaster.publish("user", username)
+
+
+broadcaster.register("user", _drop_users)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_stale(mapper, connection, target):
+    session = object_session(target)
+    usernames = {target.username}
+    # A renamed user must also drop the entry under the old name
+    usernames.update(inspect(target).attrs.username.history.deleted or ())
+    if session is not None:
+        session.info.setdefault("stale_users", set()).update(usernames)
+    else:
+        for username in usernames:
+            invalidate_user(username)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_users(session):
+    for username in session.info.pop("stale_users", ()):
+        invalidate_user(username)
+
 async def get_current_admin(current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_admin_async(current_user: User = Depends(get_current_user_async)):
+    return await get_current_admin(current_user)
\ No newline at end of file
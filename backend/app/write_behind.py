@@ -0,0 +1,351 @@
+import glob
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import Integer, case, func, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from app.catalog_cache import catalog_cache
+from app.config import settings
+from app import facets
+from app.database import SessionLocal, run_blocking
+from app.models import Sweet, WriteBehindCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def add_stock_statement(db: Session, totals: dict, floor: int = None):
+    """One UPDATE adding totals[id] (negative to remove) to each sweet's quantity.
+
+    With ``floor``, no quantity is taken below it.
+    """
+    def clamped(quantity):
+        if floor is None:
+            return quantity
+        return case((quantity < floor, floor), else_=quantity)
+
+    if db.get_bind().dialect.name == "postgresql":
+        # UPDATE ... FROM a derived table of (sweet_id, quantity) pairs,
+        # sent as two arrays so the statement has two parameters whatever
+        # the batch size
+        incoming = func.unnest(
+            literal(list(totals), ARRAY(Integer)),
+            literal(list(totals.values()), ARRAY(Integer)),
+        ).table_valued("sweet_id", "quantity").render_derived(name="incoming")
+        return (
+            update(Sweet)
+            .where(Sweet.id == incoming.c.sweet_id)
+            .values(quantity=clamped(Sweet.quantity + incoming.c.quantity))
+        )
+    added = case(totals, value=Sweet.id)
+    return (
+        update(Sweet)
+        .where(Sweet.id.in_(totals))
+        .values(quantity=clamped(Sweet.quantity + added))
+    )
+
+
+class SweetNotFound(Exception):
+    def __init__(self, sweet_id):
+        super().__init__(sweet_id)
+        self.sweet_id = sweet_id
+
+
+class OutOfStock(Exception):
+    def __init__(self, sweet_id):
+        super().__init__(sweet_id)
+        self.sweet_id = sweet_id
+
+
+class WriteBehindStock:
+    """Purchases reserved from in-memory stock and written to the database later.
+
+    Each sweet's available quantity is seeded from the sweets table on first
+    use. A purchase checks and decrements it under one lock and appends the
+    reservation to a journal; a background thread coalesces the reservations
+    and applies them with one UPDATE per flush. That UPDATE also advances a
+    checkpoint row in the same transaction, so on startup recover() replays
+    exactly the journal entries the database hasn't seen.
+
+    Writes that set a quantity outright go through overwriting(), and
+    restocks through restocked(), so neither loses or double-counts a
+    reservation that is still pending.
+
+    Counters live in this process, so the mode only holds for a single
+    worker process.
+    """
+
+    def __init__(self, session_factory, journal_path: str, flush_interval: float, fsync: bool = False):
+        self.session_factory = session_factory
+        self.journal_path = os.path.abspath(journal_path)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._stock = {}
+        self._pending = {}
+        self._seq = 0
+        self._fd = None
+        self._rotated = []
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        # Bumped when a flush takes a batch out of _pending and again once
+        # it is written, so a seed can tell whether its read overlapped one;
+        # overwrites and restocks bump it by two
+        self._flushes = 0
+        # Sweets being overwritten, with how many writers hold each; None
+        # holds them all
+        self._held = {}
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._start_lock:
+            if self._fd is not None:
+                return
+            self.recover()
+            self._fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._start_lock:
+            if self._fd is None:
+                return
+            self._stop.set()
+            self._thread.join()
+            self.flush()
+            os.close(self._fd)
+            self._fd = None
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed; will retry")
+
+    def _read_checkpoint(self, db: Session) -> int:
+        checkpoint = db.get(WriteBehindCheckpoint, self.journal_path)
+        return checkpoint.last_seq if checkpoint else 0
+
+    def _apply(self, totals: dict, last_seq: int):
+        db = self.session_factory()
+        rows = []
+        try:
+            if totals:
+                # Reservations only ever take stock the counters had; the
+                # floor keeps a bug there from writing a negative quantity
+                rows = db.execute(
+                    add_stock_statement(db, {sweet_id: -units for sweet_id, units in totals.items()}, floor=0)
+                    .returning(Sweet.id, Sweet.category)
+                    .execution_options(synchronize_session=False)
+                ).mappings().all()
+            checkpoint = db.get(WriteBehindCheckpoint, self.journal_path)
+            if checkpoint is None:
+                db.add(WriteBehindCheckpoint(journal=self.journal_path, last_seq=last_seq))
+            else:
+                checkpoint.last_seq = last_seq
+            db.commit()
+        finally:
+            db.close()
+        facets.stats.add_stock(facets.stock_deltas(rows, totals, -1))
+
+    def recover(self) -> int:
+        """Apply journaled reservations missing from the database; returns units."""
+        with self._flush_lock:
+            db = self.session_factory()
+            try:
+                applied = self._read_checkpoint(db)
+            finally:
+                db.close()
+
+            paths = glob.glob(f"{glob.escape(self.journal_path)}.*")
+            if os.path.exists(self.journal_path):
+                paths.append(self.journal_path)
+            totals = {}
+            last_seq = applied
+            for path in paths:
+                with open(path) as journal:
+                    for line in journal:
+                        parts = line.split()
+                        # A torn final line never reached the client as a sale
+                        if len(parts) != 3 or not line.endswith("\n"):
+                            continue
+                        seq, sweet_id, units = map(int, parts)
+                        last_seq = max(last_seq, seq)
+                        if seq > applied:
+                            totals[sweet_id] = totals.get(sweet_id, 0) + units
+            if last_seq > applied:
+                self._apply(totals, last_seq)
+            for path in paths:
+                os.remove(path)
+            self._seq = last_seq
+            self._stock.clear()
+            self._pending.clear()
+            self._rotated = []
+            return sum(totals.values())
+
+    def _seed(self, sweet_ids, db: Session = None):
+        # The caller's session, when given, so the async routers read over
+        # the async driver instead of blocking the event loop
+        with self._lock:
+            flushes = self._flushes
+        own_session = db is None
+        if own_session:
+            db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(Sweet.id, Sweet.name, Sweet.category, Sweet.price, Sweet.quantity)
+                .where(Sweet.id.in_(sweet_ids))
+            ).all()
+        finally:
+            if own_session:
+                db.close()
+        found = {sweet.id for sweet in rows}
+        for sweet_id in sweet_ids:
+            if sweet_id not in found:
+                raise SweetNotFound(sweet_id)
+        with self._lock:
+            # Read during a flush, the rows may or may not include the batch
+            # it took out of _pending; reserve() will read again
+            if flushes % 2 or flushes != self._flushes:
+                return
+            for sweet in rows:
+                if sweet.id not in self._stock:
+                    self._stock[sweet.id] = {
+                        "id": sweet.id,
+                        "name": sweet.name,
+                        "category": sweet.category,
+                        "price": sweet.price,
+                        "quantity": sweet.quantity - self._pending.get(sweet.id, 0),
+                    }
+
+    def reserve(self, totals: dict, db: Session = None) -> list:
+        """Take totals[id] units of each sweet, all or nothing."""
+        self.start()
+        while True:
+            with self._lock:
+                held = self._is_held(totals)
+                missing = [sweet_id for sweet_id in totals if sweet_id not in self._stock]
+                if not held and not missing:
+                    for sweet_id, units in totals.items():
+                        if self._stock[sweet_id]["quantity"] < units:
+                            raise OutOfStock(sweet_id)
+                    lines = []
+                    for sweet_id, units in totals.items():
+                        self._stock[sweet_id]["quantity"] -= units
+                        self._pending[sweet_id] = self._pending.get(sweet_id, 0) + units
+                        self._seq += 1
+                        lines.append(f"{self._seq} {sweet_id} {units}\n")
+                    os.write(self._fd, "".join(lines).encode())
+                    if self.fsync:
+                        os.fsync(self._fd)
+                    return [dict(self._stock[sweet_id]) for sweet_id in totals]
+            if held:
+                # On a thread, so the async routers' event loop keeps going
+                run_blocking(self._wait_released, totals)
+            else:
+                self._seed(missing, db)
+
+    def _is_held(self, sweet_ids) -> bool:
+        # Caller holds self._lock
+        return None in self._held or any(sweet_id in self._held for sweet_id in sweet_ids)
+
+    def _wait_released(self, sweet_ids):
+        with self._lock:
+            while self._is_held(sweet_ids):
+                self._released.wait()
+
+    @contextmanager
+    def overwriting(self, *sweet_ids):
+        """Hold purchases of these sweets (of all, given none) while the
+        block sets their quantity outright.
+
+        Their pending reservations are written first, so the next flush
+        doesn't take them off the new quantity, and the counters are seeded
+        again from it once the block is done.
+        """
+        if self._fd is None:
+            yield
+            return
+        held = sweet_ids or (None,)
+        with self._lock:
+            for sweet_id in held:
+                self._held[sweet_id] = self._held.get(sweet_id, 0) + 1
+            self._flushes += 2
+        try:
+            run_blocking(self.flush)
+            yield
+        finally:
+            with self._lock:
+                for sweet_id in held:
+                    self._held[sweet_id] -= 1
+                    if not self._held[sweet_id]:
+                        del self._held[sweet_id]
+                if sweet_ids:
+                    for sweet_id in sweet_ids:
+                        self._stock.pop(sweet_id, None)
+                else:
+                    self._stock.clear()
+                self._flushes += 2
+                self._released.notify_all()
+
+    def restocked(self, totals: dict):
+        """Add totals[id] units, already added in the database, to the counters."""
+        with self._lock:
+            for sweet_id, units in totals.items():
+                if sweet_id in self._stock:
+                    self._stock[sweet_id]["quantity"] += units
+            # A seed that read the rows before the restock must not land
+            self._flushes += 2
+
+    def forget(self, *sweet_ids):
+        """Drop cached stock after another writer removed these sweets."""
+        with self._lock:
+            for sweet_id in sweet_ids:
+                self._stock.pop(sweet_id, None)
+
+    def flush(self) -> int:
+        """Write pending reservations to the database; returns units written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._flushes += 1
+                last_seq = self._seq
+                # New reservations go to a fresh journal while this batch is
+                # written; the old one is kept until the commit lands
+                rotated = f"{self.journal_path}.{last_seq}"
+                os.rename(self.journal_path, rotated)
+                os.close(self._fd)
+                self._fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+                self._rotated.append(rotated)
+            try:
+                self._apply(batch, last_seq)
+            except Exception:
+                with self._lock:
+                    for sweet_id, units in batch.items():
+                        self._pending[sweet_id] = self._pending.get(sweet_id, 0) + units
+                raise
+            finally:
+                with self._lock:
+                    self._flushes += 1
+            for path in self._rotated:
+                os.remove(path)
+            self._rotated = []
+        catalog_cache.invalidate(*batch)
+        return sum(batch.values())
+
+
+stock = WriteBehindStock(
+    SessionLocal,
+    settings.write_behind_journal,
+    settings.write_behind_flush_ms / 1000,
+    settings.write_behind_fsync,
+)
@@ -0,0 +1,67 @@
+"""Requests/sec at high concurrency: sync routers vs async_db routers.
+
+Starts one uvicorn process per mode (catalog cache off, so every read hits
+the database) and drives it with many concurrent async clients.
+
+    python -m benchmarks.async_engine --clients 500 --requests 4000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import (
+    auth_headers, create_sweet, delete_sweets, report, serve_process, summarize,
+)
+
+
+async def drive(base_url, headers, path, clients, requests):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=120) as client:
+        queue = iter(range(requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in queue:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    errors += response.status_code != 200
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+
+    sweet_id = create_sweet(100)
+    results = []
+    try:
+        for mode, async_db in (("sync_routers", "false"), ("async_routers", "true")):
+            with serve_process(args.port, async_db=async_db, catalog_cache_backend="none") as base_url:
+                headers = auth_headers(httpx.Client(base_url=base_url), "asyncbench")
+                latencies, elapsed, errors = asyncio.run(
+                    drive(base_url, headers, f"/api/sweets/{sweet_id}", args.clients, args.requests)
+                )
+            results.append(summarize(mode, latencies, elapsed, clients=args.clients, errors=errors))
+    finally:
+        delete_sweets(sweet_id)
+
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
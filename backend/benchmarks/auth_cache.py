@@ -0,0 +1,52 @@
+"""Queries per authenticated request with and without the user cache.
+
+    python -m benchmarks.auth_cache --requests 500
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import engine
+from app.main import app
+from app.utils import user_cache
+from benchmarks.common import QueryCounter, auth_headers, create_sweet, delete_sweets, report, summarize
+
+
+def run(name, client, headers, sweet_id, requests):
+    latencies = []
+    with QueryCounter(engine) as counter:
+        start = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            client.get(f"/api/sweets/{sweet_id}", headers=headers)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+    return summarize(name, latencies, elapsed, queries_per_request=counter.count / requests)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    headers = auth_headers(client)
+    sweet_id = create_sweet(10)
+    enabled = settings.user_cache_enabled
+    try:
+        settings.user_cache_enabled = False
+        uncached = run("user_cache_off", client, headers, sweet_id, args.requests)
+        settings.user_cache_enabled = True
+        user_cache.clear()
+        cached = run("user_cache_on", client, headers, sweet_id, args.requests)
+    finally:
+        settings.user_cache_enabled = enabled
+        delete_sweets(sweet_id)
+
+    report([uncached, cached])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Bulk import/export against one-by-one creates.
+
+    python -m benchmarks.bulk --sweets 100000 --singles 500
+
+Runs the app under uvicorn in-process. Exports are repeated under
+tracemalloc (which slows them down, so they are timed separately) to show
+that peak memory doesn't grow with the catalog.
+"""
+import argparse
+import time
+import tracemalloc
+import uuid
+
+import httpx
+
+from app.main import app
+from benchmarks.common import delete_catalog, report, serve
+
+
+def admin_headers(client):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": "johndoe@john.com", "password": "12345"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def csv_lines(prefix, count):
+    yield b"name,category,price,quantity\n"
+    for n in range(count):
+        yield f"{prefix} {n},Bulk,{1 + n % 50 / 10},{n % 100}\n".encode()
+
+
+def measure(name, fn):
+    start = time.perf_counter()
+    extra = fn()
+    return {"name": name, "elapsed_s": round(time.perf_counter() - start, 3), **extra}
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweets", type=int, default=100_000)
+    parser.add_argument("--singles", type=int, default=500)
+    args = parser.parse_args()
+
+    prefix = f"Bulk {uuid.uuid4().hex[:8]}"
+    results = []
+    with serve(app) as base_url, httpx.Client(base_url=base_url, timeout=600) as client:
+        headers = admin_headers(client)
+        try:
+            def singles():
+                for n in range(args.singles):
+                    client.post("/api/sweets/create", headers=headers, json={
+                        "name": f"{prefix} single {n}", "category": "Bulk", "price": 1.0, "quantity": 1,
+                    })
+                return {"rows": args.singles}
+
+            results.append(measure("create_one_by_one", singles))
+            per_row = results[-1]["elapsed_s"] / args.singles
+            results[-1]["projected_s_for_catalog"] = round(per_row * args.sweets, 1)
+
+            def bulk_import():
+                response = client.post(
+                    "/api/sweets/import",
+                    content=csv_lines(prefix, args.sweets),
+                    headers={**headers, "Content-Type": "text/csv"},
+                )
+                return {"rows": args.sweets, "result": {k: v for k, v in response.json().items() if k != "errors"}}
+
+            results.append(measure("import_csv", bulk_import))
+            results.append(measure("reimport_csv_upsert", bulk_import))
+
+            for fmt in ("csv", "ndjson"):
+                def export():
+                    size = 0
+                    with client.stream("GET", "/api/sweets/export", params={"format": fmt}, headers=headers) as response:
+                        for chunk in response.iter_bytes():
+                            size += len(chunk)
+                    return {"bytes": size}
+
+                results.append(measure(f"export_{fmt}", export))
+                results[-1]["peak_mb"] = peak_memory(export)
+        finally:
+            delete_catalog(prefix)
+
+    report({"sweets": args.sweets, "results": results})
+
+
+if __name__ == "__main__":
+    main()
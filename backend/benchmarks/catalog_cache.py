@@ -0,0 +1,62 @@
+"""Read-endpoint throughput with the catalog cache on and off.
+
+    python -m benchmarks.catalog_cache --sweets 5000 --requests 300
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app.catalog_cache import MemoryBackend, catalog_cache
+from app.database import SessionLocal
+from app.main import app
+from app.models import Sweet
+from benchmarks.common import auth_headers, delete_catalog, report, seed_catalog, summarize
+
+
+def run(name, client, headers, path, params, requests):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        client.get(path, params=params, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweets", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    prefix = seed_catalog(args.sweets)
+    client = TestClient(app)
+    headers = auth_headers(client, "cachebench")
+    db = SessionLocal()
+    sweet_id = db.query(Sweet.id).filter(Sweet.name == f"{prefix} 0").scalar()
+    db.close()
+
+    endpoints = [
+        ("get_sweets", "/api/sweets", {"limit": 100}),
+        ("get_sweet", f"/api/sweets/{sweet_id}", {}),
+        ("search_sweets", "/api/sweets/search", {"name": "12", "limit": 100}),
+    ]
+    backend = catalog_cache.backend
+    results = []
+    try:
+        for label, path, params in endpoints:
+            catalog_cache.backend = MemoryBackend(max_size=0, ttl=1)
+            results.append(run(f"{label}_uncached", client, headers, path, params, args.requests))
+            catalog_cache.backend = backend
+            catalog_cache.invalidate(sweet_id)
+            results.append(run(f"{label}_cached", client, headers, path, params, args.requests))
+    finally:
+        catalog_cache.backend = backend
+        delete_catalog(prefix)
+
+    report({"results": results, "cache": catalog_cache.stats()})
+
+
+if __name__ == "__main__":
+    main()
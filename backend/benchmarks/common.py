@@ -0,0 +1,188 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import uvicorn
+from sqlalchemy import event, insert
+
+from app.database import SessionLocal
+from app.models import Sweet
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name, latencies, elapsed, **extra):
+    """Build a machine-readable result row (latencies in seconds)."""
+    result = {
+        "name": name,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+    result.update(extra)
+    return result
+
+
+def report(results):
+    print(json.dumps(results, indent=2))
+
+
+def run_concurrently(fn, calls, workers):
+    """Run fn(i) for i in range(calls) on a thread pool, timing each call."""
+    def timed(i):
+        start = time.perf_counter()
+        outcome = fn(i)
+        return time.perf_counter() - start, outcome
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(timed, range(calls)))
+    elapsed = time.perf_counter() - start
+    return [r[0] for r in results], [r[1] for r in results], elapsed
+
+
+def create_sweet(quantity, category="Bench", price=1.0):
+    db = SessionLocal()
+    try:
+        sweet = Sweet(
+            name=f"Bench Sweet {uuid.uuid4()}",
+            category=category,
+            price=price,
+            quantity=quantity,
+        )
+        db.add(sweet)
+        db.commit()
+        return sweet.id
+    finally:
+        db.close()
+
+
+def delete_sweets(*sweet_ids):
+    db = SessionLocal()
+    try:
+        db.query(Sweet).filter(Sweet.id.in_(sweet_ids)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def auth_headers(client, prefix="bench"):
+    """Register a throwaway user through the API and return its auth header."""
+    name = f"{prefix}{uuid.uuid4().hex[:10]}"
+    client.post("/api/auth/register", json={
+        "username": name,
+        "email": f"{name}@example.com",
+        "password": "benchpass123",
+    })
+    response = client.post(
+        "/api/auth/login",
+        data={"username": f"{name}@example.com", "password": "benchpass123"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class QueryCounter:
+    """Count statements sent through an engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _record(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@contextmanager
+def serve(app, port=8765):
+    """Run the app on a real uvicorn server in a background thread."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def seed_catalog(count, prefix=None, chunk=10000):
+    """Bulk-insert count sweets named '<prefix> <n>'; returns the prefix."""
+    prefix = prefix or f"Seed {uuid.uuid4().hex[:8]}"
+    categories = ["Chocolate", "Gummies", "Indian", "Hard Candy", "Toffee", "Sour"]
+    db = SessionLocal()
+    try:
+        for start in range(0, count, chunk):
+            db.execute(insert(Sweet), [
+                {
+                    "name": f"{prefix} {n}",
+                    "category": categories[n % len(categories)],
+                    "price": round(0.5 + (n * 7919 % 1000) / 100, 2),
+                    "quantity": n % 200,
+                }
+                for n in range(start, min(start + chunk, count))
+            ])
+            db.commit()
+    finally:
+        db.close()
+    return prefix
+
+
+def delete_catalog(prefix):
+    db = SessionLocal()
+    try:
+        db.query(Sweet).filter(Sweet.name.like(f"{prefix} %")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+@contextmanager
+def serve_process(port=8770, workers=1, **env):
+    """Run the app in separate processes via app.serve, with extra settings.
+
+    Keyword arguments become environment variables, e.g. async_db="true".
+    """
+    environ = dict(os.environ, **{key.upper(): str(value) for key, value in env.items()})
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=environ,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(200):
+            try:
+                httpx.get(f"{base_url}/", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
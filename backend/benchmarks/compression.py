@@ -0,0 +1,67 @@
+"""Bytes on the wire and latency of catalog pages by content coding.
+
+Serves the app under uvicorn and fetches 1k- and 10k-item listings with
+Accept-Encoding identity, gzip and (when the brotli package is installed)
+br. Catalog-cache hits are measured, so the numbers show the cost of
+compressing on every response. Latency is measured over loopback; the
+estimate for a slower link adds the transfer time of the bytes sent.
+
+    python -m benchmarks.compression --sizes 1000 10000 --repeat 20 --link-mbps 50
+"""
+import argparse
+import statistics
+import time
+
+import httpx
+
+from app.main import app
+from app.middleware import brotli
+from benchmarks.common import auth_headers, delete_catalog, report, seed_catalog, serve
+
+
+def fetch(client, headers, limit, encoding):
+    start = time.perf_counter()
+    response = client.get("/api/sweets", params={"limit": limit}, headers={**headers, "Accept-Encoding": encoding})
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed, response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--link-mbps", type=float, default=50, help="link speed for the transfer estimate")
+    parser.add_argument("--port", type=int, default=8791)
+    args = parser.parse_args()
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    prefix = seed_catalog(max(args.sizes))
+    results = []
+    try:
+        with serve(app, port=args.port) as base_url, httpx.Client(base_url=base_url, timeout=60) as client:
+            headers = auth_headers(client, "squeeze")
+            for limit in args.sizes:
+                for encoding in encodings:
+                    # The first call fills the catalog cache
+                    _, response = fetch(client, headers, limit, encoding)
+                    assert len(response.json()) == limit
+                    latencies = [fetch(client, headers, limit, encoding)[0] for _ in range(args.repeat)]
+                    wire = response.num_bytes_downloaded
+                    latency_ms = statistics.median(latencies) * 1000
+                    results.append({
+                        "items": limit,
+                        "encoding": response.headers.get("content-encoding", "identity"),
+                        "body_bytes": len(response.content),
+                        "wire_bytes": wire,
+                        "ratio": round(len(response.content) / wire, 2),
+                        "loopback_p50_ms": round(latency_ms, 2),
+                        f"at_{args.link_mbps:g}mbps_ms": round(latency_ms + wire * 8 / (args.link_mbps * 1000), 2),
+                    })
+    finally:
+        delete_catalog(prefix)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Microbenchmark: python-jose decode vs the verified-claims cache.
+
+    python -m benchmarks.jwt_decode --iterations 20000 --tokens 50
+"""
+import argparse
+import time
+
+from jose import jwt
+
+from app.config import settings
+from app.utils import create_access_token, decode_access_token, token_cache
+from benchmarks.common import report
+
+
+def run(name, decode, tokens, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        decode(tokens[i % len(tokens)])
+    elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "iterations": iterations,
+        "elapsed_s": round(elapsed, 4),
+        "us_per_decode": round(elapsed / iterations * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    tokens = [create_access_token(data={"sub": f"user{i}"}) for i in range(args.tokens)]
+    token_cache.clear()
+    hits, misses = token_cache.hits, token_cache.misses
+
+    results = [
+        run(
+            "jose_decode",
+            lambda t: jwt.decode(t, settings.secret_key, algorithms=[settings.algorithm]),
+            tokens,
+            args.iterations,
+        ),
+        run("cached_decode", decode_access_token, tokens, args.iterations),
+    ]
+    lookups = (token_cache.hits - hits) + (token_cache.misses - misses)
+    results[1]["hit_rate"] = round((token_cache.hits - hits) / lookups, 4)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
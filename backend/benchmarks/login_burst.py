@@ -0,0 +1,79 @@
+"""Catalog read latency with and without a concurrent login burst.
+
+Starts the API on a local uvicorn server, measures GET /api/sweets on its
+own, then again while many clients log in at once.
+
+    python -m benchmarks.login_burst --readers 8 --reads 100 --logins 200
+"""
+import argparse
+import threading
+import time
+
+import httpx
+
+from app.main import app
+from app.password_pool import password_pool
+from benchmarks.common import auth_headers, report, run_concurrently, serve, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--reads", type=int, default=100)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with serve(app, args.port) as base_url:
+        client = httpx.Client(base_url=base_url)
+        headers = auth_headers(client, "burst")
+
+        def catalog_latencies():
+            samples = []
+
+            def read(_):
+                with httpx.Client(base_url=base_url, headers=headers, timeout=60) as reader:
+                    for _ in range(args.reads):
+                        start = time.perf_counter()
+                        reader.get("/api/sweets", params={"limit": 20})
+                        samples.append(time.perf_counter() - start)
+
+            _, _, elapsed = run_concurrently(read, args.readers, args.readers)
+            return samples, elapsed
+
+        quiet, quiet_elapsed = catalog_latencies()
+
+        outcomes = []
+
+        def burst():
+            def login(_):
+                with httpx.Client(base_url=base_url, timeout=60) as anon:
+                    response = anon.post(
+                        "/api/auth/login",
+                        data={"username": "johndoe@john.com", "password": "12345"},
+                    )
+                    return response.status_code
+
+            _, codes, _ = run_concurrently(login, args.logins, 64)
+            outcomes.extend(codes)
+
+        burst_thread = threading.Thread(target=burst)
+        burst_thread.start()
+        loaded, loaded_elapsed = catalog_latencies()
+        burst_thread.join()
+
+    report([
+        summarize("catalog_quiet", quiet, quiet_elapsed),
+        summarize(
+            "catalog_during_login_burst",
+            loaded,
+            loaded_elapsed,
+            logins_ok=outcomes.count(200),
+            logins_shed=outcomes.count(503),
+            pool_workers=password_pool.workers,
+        ),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Per-request cost of the metrics middleware and SQL instrumentation.
+
+    python -m benchmarks.metrics --requests 2000 --rounds 5
+
+Requests are sent straight into the ASGI app from one event loop, so the
+HTTP client's own cost doesn't drown out the middleware's. Rounds with
+metrics on and off alternate on the same app and the median of each is
+reported, so drift affects both sides alike.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import timeit
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.database import engine
+from app.main import app
+from benchmarks.common import auth_headers, create_sweet, delete_sweets, report
+
+
+def set_metrics(enabled):
+    # The stack is rebuilt on the next request
+    app.middleware_stack = None
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not metrics.MetricsMiddleware]
+    if enabled:
+        app.add_middleware(metrics.MetricsMiddleware)
+        metrics.instrument_engine(engine)
+    else:
+        metrics.uninstrument_engine(engine)
+
+
+async def call(path, headers):
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": raw_path, "raw_path": raw_path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    assert status == 200, status
+
+
+def per_request_us(path, headers, requests):
+    async def run():
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(path, headers)
+        return (time.perf_counter() - start) / requests * 1e6
+    return asyncio.run(run())
+
+
+def bookkeeping_us(number=100_000):
+    """What the middleware records per request, without the request."""
+    def record():
+        token = metrics.request_queries.set([0, 0.0])
+        metrics.IN_FLIGHT.inc()
+        metrics.IN_FLIGHT.dec()
+        metrics.request_queries.reset(token)
+        metrics.REQUESTS.inc(method="GET", route="/bench", status=200)
+        metrics.REQUEST_SECONDS.observe(0.003, method="GET", route="/bench")
+        metrics.REQUEST_QUERIES.observe(2, route="/bench")
+        metrics.REQUEST_QUERY_SECONDS.observe(0.001, route="/bench")
+    return timeit.timeit(record, number=number) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    headers = auth_headers(client, "metricsbench")
+    sweet_id = create_sweet(10)
+    endpoints = [
+        ("root", "/", {}),
+        ("get_sweet_cached", f"/api/sweets/{sweet_id}", headers),
+        ("list_sweets_cached", "/api/sweets?limit=50", headers),
+    ]
+    results = []
+    try:
+        for name, path, request_headers in endpoints:
+            samples = {True: [], False: []}
+            for _ in range(args.rounds):
+                for enabled in (False, True):
+                    set_metrics(enabled)
+                    per_request_us(path, request_headers, 50)
+                    samples[enabled].append(per_request_us(path, request_headers, args.requests))
+            off = statistics.median(samples[False])
+            on = statistics.median(samples[True])
+            results.append({
+                "name": name,
+                "off_us": round(off, 1),
+                "on_us": round(on, 1),
+                "overhead_us": round(on - off, 1),
+                "overhead_pct": round((on - off) / off * 100, 1),
+            })
+    finally:
+        set_metrics(True)
+        delete_sweets(sweet_id)
+
+    report({"bookkeeping_us": round(bookkeeping_us(), 2), "endpoints": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Per-page latency of offset vs keyset pagination at increasing depth.
+
+    python -m benchmarks.pagination --sweets 1000000 --limit 50
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Sweet
+from app.routers.sweets import SORT_COLUMNS, encode_cursor
+from benchmarks.common import auth_headers, delete_catalog, report, seed_catalog
+
+
+def median_latency(client, headers, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/api/sweets", params=params, headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweets", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    prefix = seed_catalog(args.sweets)
+    client = TestClient(app)
+    headers = auth_headers(client, "pager")
+    results = []
+    try:
+        db = SessionLocal()
+        total = db.query(Sweet).count()
+        for sort in ("id", "price"):
+            column = SORT_COLUMNS[sort]
+            for fraction in (0, 0.1, 0.5, 0.9):
+                depth = int(total * fraction)
+                offset_ms = median_latency(
+                    client, headers,
+                    {"sort": sort, "skip": depth, "limit": args.limit},
+                    args.repeat,
+                )
+                row = {"sort": sort, "depth": depth, "offset_ms": round(offset_ms, 2)}
+                if depth:
+                    # The cursor a client would hold after paging down to depth
+                    last = (
+                        db.query(Sweet).order_by(column, Sweet.id)
+                        .offset(depth - 1).limit(1).first()
+                    )
+                    cursor_ms = median_latency(
+                        client, headers,
+                        {"sort": sort, "cursor": encode_cursor(sort, last), "limit": args.limit},
+                        args.repeat,
+                    )
+                    row["cursor_ms"] = round(cursor_ms, 2)
+                else:
+                    row["cursor_ms"] = row["offset_ms"]
+                results.append(row)
+        db.close()
+    finally:
+        delete_catalog(prefix)
+
+    report({"catalog_size": total, "page_size": args.limit, "pages": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Purchase throughput with the old 5+10 pool vs the configured pool.
+
+Serves the API with uvicorn and drives concurrent purchases, which each
+hold a pooled connection for the whole request.
+
+    python -m benchmarks.pool_load --clients 64 --requests 20
+"""
+import argparse
+
+import httpx
+
+from app import database
+from app.config import settings
+from app.main import app
+from benchmarks.common import (
+    auth_headers, create_sweet, delete_sweets, report, run_concurrently, serve, summarize,
+)
+
+
+def run(name, base_url, headers, clients, requests, **pool_options):
+    engine = database.build_engine(**pool_options)
+    database._engine = engine
+    database.SessionLocal.configure(bind=engine)
+    sweet_id = create_sweet(clients * requests)
+    peak = {"checked_out": 0}
+    samples = []
+
+    def client_loop(_):
+        with httpx.Client(base_url=base_url, headers=headers, timeout=120) as client:
+            for _ in range(requests):
+                response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 1})
+                samples.append(response.elapsed.total_seconds())
+                status = client.get("/health/pool").json()
+                peak["checked_out"] = max(peak["checked_out"], status["checked_out"])
+
+    try:
+        _, _, elapsed = run_concurrently(client_loop, clients, clients)
+    finally:
+        delete_sweets(sweet_id)
+        engine.dispose()
+    return summarize(name, samples, elapsed, peak_checked_out=peak["checked_out"], **pool_options)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    original = database.get_engine()
+    with serve(app, args.port) as base_url:
+        headers = auth_headers(httpx.Client(base_url=base_url), "poolbench")
+        try:
+            results = [
+                run("default_pool", base_url, headers, args.clients, args.requests,
+                    pool_size=5, max_overflow=10),
+                run("configured_pool", base_url, headers, args.clients, args.requests,
+                    pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow),
+            ]
+        finally:
+            database._engine = original
+            database.SessionLocal.configure(bind=original)
+
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Hot-row purchase benchmark: read-modify-write vs conditional UPDATE.
+
+Fires many parallel single-unit purchases at one sweet and reports
+throughput, latency and how many units were oversold.
+
+    python -m benchmarks.purchase --calls 500 --workers 64 --stock 300
+"""
+import argparse
+
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models import Sweet
+from benchmarks.common import create_sweet, delete_sweets, report, run_concurrently, summarize
+
+
+def legacy_purchase(sweet_id, quantity):
+    # The pre-RETURNING path: SELECT, check in Python, write, commit, refresh
+    db = SessionLocal()
+    try:
+        sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+        if sweet.quantity < quantity:
+            return False
+        sweet.quantity -= quantity
+        db.commit()
+        db.refresh(sweet)
+        return True
+    finally:
+        db.close()
+
+
+def atomic_purchase(sweet_id, quantity):
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            update(Sweet)
+            .where(Sweet.id == sweet_id, Sweet.quantity >= quantity)
+            .values(quantity=Sweet.quantity - quantity)
+            .returning(*Sweet.__table__.c)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+        return row is not None
+    finally:
+        db.close()
+
+
+def run(name, purchase, calls, workers, stock):
+    sweet_id = create_sweet(stock)
+    try:
+        latencies, outcomes, elapsed = run_concurrently(
+            lambda _: purchase(sweet_id, 1), calls, workers
+        )
+        db = SessionLocal()
+        remaining = db.query(Sweet.quantity).filter(Sweet.id == sweet_id).scalar()
+        db.close()
+    finally:
+        delete_sweets(sweet_id)
+
+    sold = sum(outcomes)
+    return summarize(
+        name,
+        latencies,
+        elapsed,
+        sold=sold,
+        remaining=remaining,
+        oversold=sold - (stock - remaining),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--stock", type=int, default=300)
+    args = parser.parse_args()
+
+    report([
+        run("legacy_read_modify_write", legacy_purchase, args.calls, args.workers, args.stock),
+        run("atomic_update_returning", atomic_purchase, args.calls, args.workers, args.stock),
+    ])
+
+
+if __name__ == "__main__":
+    main()
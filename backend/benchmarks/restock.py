@@ -0,0 +1,79 @@
+"""Nightly-restock style run: one request per sweet vs one batch request.
+
+    python -m benchmarks.restock --sweets 2000
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Sweet
+from benchmarks.common import delete_catalog, report, seed_catalog
+
+
+def admin_headers(client):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": "johndoe@john.com", "password": "12345"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def stock_total(prefix):
+    db = SessionLocal()
+    total = sum(q for (q,) in db.query(Sweet.quantity).filter(Sweet.name.like(f"{prefix} %")))
+    db.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweets", type=int, default=2000)
+    args = parser.parse_args()
+
+    prefix = seed_catalog(args.sweets)
+    client = TestClient(app)
+    headers = admin_headers(client)
+    db = SessionLocal()
+    ids = [i for (i,) in db.query(Sweet.id).filter(Sweet.name.like(f"{prefix} %"))]
+    db.close()
+
+    results = []
+    try:
+        before = stock_total(prefix)
+        start = time.perf_counter()
+        for sweet_id in ids:
+            client.post(f"/api/sweets/{sweet_id}/restock", json={"quantity": 1}, headers=headers)
+        results.append({
+            "name": "single_restock_loop",
+            "requests": len(ids),
+            "elapsed_s": round(time.perf_counter() - start, 3),
+            "units_added": stock_total(prefix) - before,
+        })
+
+        before = stock_total(prefix)
+        start = time.perf_counter()
+        response = client.post(
+            "/api/sweets/restock/batch",
+            json={"items": [{"sweet_id": sweet_id, "quantity": 1} for sweet_id in ids]},
+            headers=headers,
+        )
+        results.append({
+            "name": "batch_restock",
+            "requests": 1,
+            "elapsed_s": round(time.perf_counter() - start, 3),
+            "units_added": stock_total(prefix) - before,
+            "restocked": sum(item["status"] == "restocked" for item in response.json()),
+        })
+    finally:
+        delete_catalog(prefix)
+
+    results[1]["speedup"] = round(results[0]["elapsed_s"] / results[1]["elapsed_s"], 1)
+    report({"sweets": args.sweets, "results": results})
+
+
+if __name__ == "__main__":
+    main()
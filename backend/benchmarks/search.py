@@ -0,0 +1,75 @@
+"""Search latency: the old unranked ILIKE scan vs the indexed search path.
+
+    python -m benchmarks.search --sweets 200000
+"""
+import argparse
+import statistics
+import time
+
+from app import search
+from app.database import SessionLocal, engine
+from app.models import Sweet
+from benchmarks.common import delete_catalog, report, seed_catalog
+
+QUERIES = [
+    {"name": "12345"},
+    {"name": "seed", "max_price": 2.0},
+    {"category": "toffee"},
+    {"name": "99", "category": "choc"},
+]
+
+
+def legacy_search(db, name=None, category=None, min_price=None, max_price=None):
+    query = db.query(Sweet)
+    if name:
+        query = query.filter(Sweet.name.ilike(f"%{name}%"))
+    if category:
+        query = query.filter(Sweet.category.ilike(f"%{category}%"))
+    return search.apply_price_range(query, min_price, max_price).all()
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweets", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    prefix = seed_catalog(args.sweets)
+    backend = search.setup_search(engine)
+    search.ngram_index.clear()
+    results = []
+    try:
+        db = SessionLocal()
+        start = time.perf_counter()
+        if backend == "ngram":
+            search.ngram_index.load(db)
+        load_ms = round((time.perf_counter() - start) * 1000, 2)
+        for params in QUERIES:
+            results.append({
+                "query": params,
+                "legacy_ilike_ms": median_ms(lambda: legacy_search(db, **params), args.repeat),
+                f"{backend}_ms": median_ms(
+                    lambda: search.search_sweets(db, limit=args.limit, **params),
+                    args.repeat,
+                ),
+            })
+        db.close()
+    finally:
+        delete_catalog(prefix)
+        search.ngram_index.clear()
+
+    report({"backend": backend, "index_load_ms": load_ms, "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Catalog listing encode cost: ORM objects + pydantic vs column rows + orjson.
+
+Loads the same rows both ways and turns them into the response body, as
+get_sweets/search_sweets do on a cache miss, reporting CPU time per call
+and peak traced memory.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 20
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.database import SessionLocal
+from app.models import Sweet
+from app.schemas import SweetResponse
+from app.serialization import SWEET_COLUMNS, dump_sweets
+from benchmarks.common import delete_catalog, report, seed_catalog
+
+sweet_list = TypeAdapter(List[SweetResponse])
+
+
+def orm_pydantic(db, prefix, rows):
+    # The previous path: full entities, validated one by one from attributes
+    sweets = db.query(Sweet).filter(Sweet.name.like(f"{prefix} %")).order_by(Sweet.id).limit(rows).all()
+    body = sweet_list.dump_json(sweet_list.validate_python(sweets, from_attributes=True))
+    db.expunge_all()
+    return body
+
+
+def rows_orjson(db, prefix, rows):
+    result = db.query(*SWEET_COLUMNS).filter(Sweet.name.like(f"{prefix} %")).order_by(Sweet.id).limit(rows).all()
+    return dump_sweets(result)
+
+
+def measure(fn, db, prefix, rows, repeat):
+    fn(db, prefix, rows)
+    cpu = []
+    wall = []
+    for _ in range(repeat):
+        start_cpu, start_wall = time.process_time(), time.perf_counter()
+        fn(db, prefix, rows)
+        cpu.append(time.process_time() - start_cpu)
+        wall.append(time.perf_counter() - start_wall)
+
+    tracemalloc.start()
+    body = fn(db, prefix, rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "path": fn.__name__,
+        "rows": rows,
+        "cpu_ms": round(statistics.median(cpu) * 1000, 2),
+        "wall_ms": round(statistics.median(wall) * 1000, 2),
+        "peak_mib": round(peak / 2**20, 2),
+        "body_bytes": len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    prefix = seed_catalog(args.rows)
+    db = SessionLocal()
+    try:
+        assert orm_pydantic(db, prefix, args.rows) == rows_orjson(db, prefix, args.rows)
+        results = [measure(fn, db, prefix, args.rows, args.repeat) for fn in (orm_pydantic, rows_orjson)]
+    finally:
+        db.close()
+        delete_catalog(prefix)
+    baseline = results[0]
+    for row in results[1:]:
+        row["cpu_reduction_pct"] = round((1 - row["cpu_ms"] / baseline["cpu_ms"]) * 100, 1)
+        row["peak_reduction_pct"] = round((1 - row["peak_mib"] / baseline["peak_mib"]) * 100, 1)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
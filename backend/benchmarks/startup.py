@@ -0,0 +1,108 @@
+"""Worker cold start and test-collection time.
+
+Each run is a fresh interpreter, so module imports are paid every time:
+
+- import: ``import app.main``, all a worker does now before serving
+- import_and_bootstrap: the same plus the schema step, which every worker
+  used to run at import (``python -m app.bootstrap`` now runs it once)
+- worker_ready: uvicorn started until ``/`` answers, with and without
+  bootstrap_on_startup
+- collect: ``pytest --collect-only`` over tests/
+
+The number of statements the schema step sends is reported too; against a
+remote database each is at least one network round trip per worker start.
+
+    python -m benchmarks.startup --repeat 10
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app import metrics
+from app.bootstrap import bootstrap
+from benchmarks.common import report
+
+
+def timed_run(command, env=None):
+    start = time.perf_counter()
+    subprocess.run(
+        command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, **(env or {})),
+    )
+    return time.perf_counter() - start
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def worker_ready(env=None):
+    """Seconds from spawning uvicorn until it answers a request."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ, **(env or {})),
+    )
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1).raise_for_status()
+                return time.perf_counter() - start
+            except httpx.TransportError:
+                if process.poll() is not None:
+                    raise RuntimeError("uvicorn exited before serving")
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def measure(name, fn, repeat):
+    samples = [fn() for _ in range(repeat)]
+    return {
+        "name": name,
+        "runs": repeat,
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def bootstrap_statements():
+    before = metrics.QUERIES.value()
+    bootstrap()
+    return metrics.QUERIES.value() - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    python = sys.executable
+    results = [
+        measure("import", lambda: timed_run([python, "-c", "import app.main"]), args.repeat),
+        measure("import_and_bootstrap", lambda: timed_run(
+            [python, "-c", "import app.main; from app.bootstrap import bootstrap; bootstrap()"]
+        ), args.repeat),
+        measure("worker_ready", worker_ready, args.repeat),
+        measure("worker_ready_bootstrap_on_startup",
+                lambda: worker_ready({"BOOTSTRAP_ON_STARTUP": "true"}), args.repeat),
+        measure("collect", lambda: timed_run([python, "-m", "pytest", "--collect-only", "-q", "tests"]),
+                args.repeat),
+    ]
+    results.append({"name": "bootstrap_statements", "count": bootstrap_statements()})
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
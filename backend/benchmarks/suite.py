@@ -0,0 +1,295 @@
+"""Mixed-workload load test with machine-readable results.
+
+Seeds a catalog, starts the API under uvicorn in a separate process and
+drives list/get/search/purchase/login traffic from concurrent clients for
+a fixed time, then reports throughput and p50/p95/p99 latency per endpoint.
+
+    # Throwaway SQLite database in a temp directory (the default)
+    python -m benchmarks.suite --sweets 10000 --duration 30 --output run.json
+
+    # A disposable PostgreSQL database
+    python -m benchmarks.suite --database-url postgresql://user:pw@localhost/bench
+
+    # Compare against an earlier run
+    python -m benchmarks.suite --compare run.json
+
+The operation mix, client count and random seed are recorded in the
+output together with the git commit, so runs can be compared later.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+import httpx
+
+DEFAULT_MIX = "list=30,get=30,search=20,purchase=15,login=5"
+CATEGORIES = ["Chocolate", "Gummies", "Indian", "Hard Candy", "Toffee", "Sour"]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; choose from {sorted(OPERATIONS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Workload:
+    def __init__(self, client, sweet_ids, users, hot):
+        self.client = client
+        self.sweet_ids = sweet_ids
+        self.users = users
+        self.hot = hot
+
+    def sweet_id(self, rng):
+        if self.hot and rng.random() < self.hot:
+            return self.sweet_ids[0]
+        return rng.choice(self.sweet_ids)
+
+    def user(self, rng):
+        return rng.choice(self.users)
+
+    def list(self, rng):
+        sort = rng.choice(["id", "name", "price"])
+        return self.client.get("/api/sweets", params={"limit": 50, "sort": sort}, headers=self.user(rng)["headers"])
+
+    def get(self, rng):
+        return self.client.get(f"/api/sweets/{self.sweet_id(rng)}", headers=self.user(rng)["headers"])
+
+    def search(self, rng):
+        if rng.random() < 0.5:
+            params = {"name": str(rng.randint(10, 99))}
+        else:
+            params = {"category": rng.choice(CATEGORIES)[:4].lower()}
+        return self.client.get("/api/sweets/search", params=params, headers=self.user(rng)["headers"])
+
+    def purchase(self, rng):
+        return self.client.post(
+            f"/api/sweets/{self.sweet_id(rng)}/purchase",
+            json={"quantity": 1},
+            headers=self.user(rng)["headers"],
+        )
+
+    def login(self, rng):
+        user = self.user(rng)
+        return self.client.post(
+            "/api/auth/login",
+            data={"username": user["email"], "password": user["password"]},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+
+OPERATIONS = {
+    "list": ("GET /api/sweets", Workload.list),
+    "get": ("GET /api/sweets/{sweet_id}", Workload.get),
+    "search": ("GET /api/sweets/search", Workload.search),
+    "purchase": ("POST /api/sweets/{sweet_id}/purchase", Workload.purchase),
+    "login": ("POST /api/auth/login", Workload.login),
+}
+
+
+def register_users(client, prefix, count):
+    users = []
+    for n in range(count):
+        name = f"{prefix}{n}"
+        user = {"email": f"{name}@example.com", "password": "suitepass123"}
+        client.post("/api/auth/register", json={"username": name, **user})
+        response = client.post(
+            "/api/auth/login",
+            data={"username": user["email"], "password": user["password"]},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        response.raise_for_status()
+        user["headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        users.append(user)
+    return users
+
+
+def drive(workload, mix, clients, duration, seed, warmup):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+    outcomes = {name: {"ok": 0, "rejected": 0, "errors": 0} for name in names}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        local = {name: [] for name in names}
+        counts = {name: {"ok": 0, "rejected": 0, "errors": 0} for name in names}
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = OPERATIONS[name][1](workload, rng).status_code
+            except httpx.TransportError:
+                status = None
+            elapsed = time.perf_counter() - start
+            if start < measure_from:
+                continue
+            local[name].append(elapsed)
+            if status is not None and status < 400:
+                counts[name]["ok"] += 1
+            elif name == "purchase" and status == 400:
+                # Sold out is a valid answer, not a failure
+                counts[name]["rejected"] += 1
+            else:
+                counts[name]["errors"] += 1
+        with lock:
+            for name in names:
+                samples[name].extend(local[name])
+                for key, value in counts[name].items():
+                    outcomes[name][key] += value
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, outcomes, duration
+
+
+def compare(results, baseline):
+    """Relative change per endpoint against an earlier run's output."""
+    before = {row["name"]: row for row in baseline["results"]}
+    rows = []
+    for row in results:
+        old = before.get(row["name"])
+        if not old:
+            continue
+        change = {"name": row["name"]}
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if old[key]:
+                change[f"{key}_change_pct"] = round((row[key] - old[key]) / old[key] * 100, 1)
+        rows.append(change)
+    return {"baseline_commit": baseline["meta"].get("commit"), "endpoints": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--sweets", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--hot", type=float, default=0.0,
+                        help="share of get/purchase calls aimed at one sweet")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--no-cache", action="store_true", help="run with catalog_cache_backend=none")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    workdir = None
+    if args.database_url is None:
+        workdir = tempfile.TemporaryDirectory(prefix="sweetshop-bench-")
+        args.database_url = f"sqlite:///{os.path.join(workdir.name, 'bench.db')}"
+    # Settings are read at import, so the target database has to be in
+    # the environment before anything under app/ is imported
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SECRET_KEY", uuid.uuid4().hex)
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+    from app.bootstrap import bootstrap
+    bootstrap()
+    from app.database import SessionLocal
+    from app.models import Sweet, User
+    from benchmarks.common import delete_catalog, report, seed_catalog, serve_process, summarize
+
+    prefix = seed_catalog(args.sweets)
+    user_prefix = f"suite{uuid.uuid4().hex[:6]}u"
+    db = SessionLocal()
+    sweet_ids = [i for (i,) in db.query(Sweet.id).filter(Sweet.name.like(f"{prefix} %")).order_by(Sweet.id)]
+    # Plenty of stock, so purchases measure the write path rather than sold-out checks
+    db.query(Sweet).filter(Sweet.name.like(f"{prefix} %")).update(
+        {"quantity": Sweet.quantity + 10**6}, synchronize_session=False
+    )
+    db.commit()
+    db.close()
+
+    env = {}
+    if args.no_cache:
+        env["catalog_cache_backend"] = "none"
+    try:
+        with serve_process(args.port, **env) as base_url:
+            limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+            with httpx.Client(base_url=base_url, limits=limits, timeout=60) as client:
+                users = register_users(client, user_prefix, args.users)
+                workload = Workload(client, sweet_ids, users, args.hot)
+                samples, outcomes, elapsed = drive(
+                    workload, args.mix, args.clients, args.duration, args.seed, args.warmup
+                )
+    finally:
+        delete_catalog(prefix)
+        db = SessionLocal()
+        db.query(User).filter(User.username.like(f"{user_prefix}%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        if workdir is not None:
+            workdir.cleanup()
+
+    results = [
+        summarize(OPERATIONS[name][0], latencies, elapsed, **outcomes[name])
+        for name, latencies in samples.items()
+    ]
+    everything = [latency for latencies in samples.values() for latency in latencies]
+    results.append(summarize("total", everything, elapsed, **{
+        key: sum(outcome[key] for outcome in outcomes.values()) for key in ("ok", "rejected", "errors")
+    }))
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "database": args.database_url.split(":", 1)[0],
+            "sweets": args.sweets,
+            "users": args.users,
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "hot": args.hot,
+            "seed": args.seed,
+            "catalog_cache": not args.no_cache,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as baseline:
+            output["comparison"] = compare(results, json.load(baseline))
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(output, out, indent=2)
+    report(output)
+
+
+if __name__ == "__main__":
+    main()
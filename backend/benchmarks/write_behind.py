@@ -0,0 +1,74 @@
+"""Hot-item purchases: conditional UPDATE per call vs write-behind reservations.
+
+    python -m benchmarks.write_behind --calls 3000 --workers 64 --stock 2000
+"""
+import argparse
+import os
+import tempfile
+
+from app.database import SessionLocal
+from app.models import Sweet, WriteBehindCheckpoint
+from app.write_behind import OutOfStock, WriteBehindStock
+from benchmarks.common import create_sweet, delete_sweets, report, run_concurrently, summarize
+from benchmarks.purchase import atomic_purchase
+
+
+def remaining(sweet_id):
+    db = SessionLocal()
+    quantity = db.query(Sweet.quantity).filter(Sweet.id == sweet_id).scalar()
+    db.close()
+    return quantity
+
+
+def run(name, purchase, calls, workers, stock, after=None):
+    sweet_id = create_sweet(stock)
+    try:
+        latencies, outcomes, elapsed = run_concurrently(
+            lambda _: purchase(sweet_id, 1), calls, workers
+        )
+        if after:
+            after()
+        left = remaining(sweet_id)
+    finally:
+        delete_sweets(sweet_id)
+
+    sold = sum(outcomes)
+    return summarize(name, latencies, elapsed, sold=sold, remaining=left, oversold=sold - (stock - left))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--stock", type=int, default=2000)
+    parser.add_argument("--flush-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        stock = WriteBehindStock(
+            SessionLocal, os.path.join(journal_dir, "bench.journal"), args.flush_ms / 1000
+        )
+
+        def reserve(sweet_id, quantity):
+            try:
+                stock.reserve({sweet_id: quantity})
+                return True
+            except OutOfStock:
+                return False
+
+        try:
+            results = [
+                run("atomic_update_returning", atomic_purchase, args.calls, args.workers, args.stock),
+                run("write_behind", reserve, args.calls, args.workers, args.stock, after=stock.stop),
+            ]
+        finally:
+            db = SessionLocal()
+            db.query(WriteBehindCheckpoint).filter(WriteBehindCheckpoint.journal == stock.journal_path).delete()
+            db.commit()
+            db.close()
+
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import pytest
+
+from app.bootstrap import bootstrap
+from app.config import settings
+
+# The suite logs in and buys from one address far more often than the
+# per-client limits allow; tests/test_rate_limit.py turns them back on
+settings.rate_limit_enabled = False
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    # Importing the app no longer creates tables; do it once per run
+    bootstrap()
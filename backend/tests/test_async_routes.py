@@ -0,0 +1,69 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.database import get_async_engine
+from app.routers import async_auth, async_sweets, async_inventory
+import uuid
+
+# The async routers on their own, whatever async_db is set to
+app = FastAPI()
+app.include_router(async_auth.router)
+app.include_router(async_sweets.router)
+app.include_router(async_inventory.router)
+
+
+def test_async_routes():
+    # One client for the whole test: async connections belong to its loop
+    with TestClient(app) as client:
+        name = f"asyncuser{uuid.uuid4().hex[:8]}"
+        response = client.post("/api/auth/register", json={
+            "username": name,
+            "email": f"{name}@example.com",
+            "password": "asyncpass123"
+        })
+        assert response.status_code == 200
+
+        login_response = client.post(
+            "/api/auth/login",
+            data={
+                "username": f"{name}@example.com",
+                "password": "asyncpass123"
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        assert login_response.status_code == 200
+        token = login_response.json()["access_token"]
+        auth_headers = {"Authorization": f"Bearer {token}"}
+
+        sweet_data = {
+            "name": f"Async Almond {uuid.uuid4()}",
+            "category": "Nuts",
+            "price": 2.25,
+            "quantity": 30
+        }
+        response = client.post("/api/sweets/create", json=sweet_data, headers=auth_headers)
+        assert response.status_code == 200
+        sweet_id = response.json()["id"]
+
+        response = client.post(
+            f"/api/sweets/{sweet_id}/purchase",
+            json={"quantity": 4},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        assert response.json()["quantity"] == 26
+
+        response = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers)
+        assert response.json()["quantity"] == 26
+
+        response = client.get(
+            "/api/sweets/search",
+            params={"name": sweet_data["name"]},
+            headers=auth_headers,
+        )
+        assert [sweet["id"] for sweet in response.json()] == [sweet_id]
+
+        # Non-admins still can't delete
+        response = client.delete(f"/api/sweets/{sweet_id}", headers=auth_headers)
+        assert response.status_code == 403
+
+        client.portal.call(get_async_engine().dispose)
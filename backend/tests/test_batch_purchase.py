@@ -0,0 +1,112 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.models import Sweet
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    user_data = {
+        "username": "cartuser",
+        "email": "cart@example.com",
+        "password": "cartpass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "cart@example.com",
+            "password": "cartpass123"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_sweet(auth_headers, quantity):
+    sweet_data = {
+        "name": f"Cart Candy {uuid.uuid4()}",
+        "category": "Candy",
+        "price": 1.25,
+        "quantity": quantity
+    }
+    response = client.post(
+        "/api/sweets/create",
+        json=sweet_data,
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_batch_purchase():
+    auth_headers = get_auth_headers()
+    first_id = create_sweet(auth_headers, 10)
+    second_id = create_sweet(auth_headers, 20)
+
+    response = client.post(
+        "/api/sweets/purchase/batch",
+        json={"items": [
+            {"sweet_id": first_id, "quantity": 3},
+            {"sweet_id": second_id, "quantity": 5},
+            {"sweet_id": first_id, "quantity": 2},
+        ]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [sweet["id"] for sweet in body] == [first_id, second_id]
+    assert [sweet["quantity"] for sweet in body] == [5, 15]
+
+
+def test_batch_purchase_is_all_or_nothing():
+    auth_headers = get_auth_headers()
+    first_id = create_sweet(auth_headers, 10)
+    second_id = create_sweet(auth_headers, 1)
+
+    response = client.post(
+        "/api/sweets/purchase/batch",
+        json={"items": [
+            {"sweet_id": first_id, "quantity": 3},
+            {"sweet_id": second_id, "quantity": 2},
+        ]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Not enough stock available for sweet {second_id}"
+
+    # Nothing was decremented
+    db = SessionLocal()
+    quantities = dict(
+        db.query(Sweet.id, Sweet.quantity)
+        .filter(Sweet.id.in_([first_id, second_id]))
+        .all()
+    )
+    db.close()
+
+    assert quantities == {first_id: 10, second_id: 1}
+
+
+def test_batch_purchase_missing_sweet():
+    auth_headers = get_auth_headers()
+    sweet_id = create_sweet(auth_headers, 10)
+
+    response = client.post(
+        "/api/sweets/purchase/batch",
+        json={"items": [
+            {"sweet_id": sweet_id, "quantity": 1},
+            {"sweet_id": 999999999, "quantity": 1},
+        ]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Sweet 999999999 not found"
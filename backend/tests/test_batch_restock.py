@@ -0,0 +1,101 @@
+from fastapi.testclient import TestClient
+from app.main import app
+import uuid
+
+client = TestClient(app)
+
+
+def get_admin_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_sweet(auth_headers, quantity):
+    sweet_data = {
+        "name": f"Restock Candy {uuid.uuid4()}",
+        "category": "Candy",
+        "price": 0.75,
+        "quantity": quantity
+    }
+    response = client.post("/api/sweets/create", json=sweet_data, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_batch_restock():
+    auth_headers = get_admin_headers()
+    first_id = create_sweet(auth_headers, 1)
+    second_id = create_sweet(auth_headers, 5)
+    # Cached, so the batch has to invalidate it
+    client.get(f"/api/sweets/{first_id}", headers=auth_headers)
+
+    response = client.post(
+        "/api/sweets/restock/batch",
+        json={"items": [
+            {"sweet_id": first_id, "quantity": 10},
+            {"sweet_id": 999999999, "quantity": 3},
+            {"sweet_id": second_id, "quantity": 20},
+            {"sweet_id": first_id, "quantity": 5},
+        ]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"sweet_id": first_id, "status": "restocked", "quantity": 16},
+        {"sweet_id": 999999999, "status": "not_found", "quantity": None},
+        {"sweet_id": second_id, "status": "restocked", "quantity": 25},
+    ]
+
+    response = client.get(f"/api/sweets/{first_id}", headers=auth_headers)
+    assert response.json()["quantity"] == 16
+
+
+def test_batch_restock_rejects_non_positive_quantity():
+    auth_headers = get_admin_headers()
+    sweet_id = create_sweet(auth_headers, 1)
+
+    response = client.post(
+        "/api/sweets/restock/batch",
+        json={"items": [
+            {"sweet_id": sweet_id, "quantity": 10},
+            {"sweet_id": sweet_id, "quantity": 0},
+        ]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 400
+    response = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers)
+    assert response.json()["quantity"] == 1
+
+
+def test_batch_restock_requires_admin():
+    user_data = {
+        "username": "restockuser",
+        "email": "restock@example.com",
+        "password": "restockpass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+    login_response = client.post(
+        "/api/auth/login",
+        data={"username": "restock@example.com", "password": "restockpass123"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    token = login_response.json()["access_token"]
+
+    response = client.post(
+        "/api/sweets/restock/batch",
+        json={"items": [{"sweet_id": 1, "quantity": 1}]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 403
@@ -0,0 +1,184 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.models import Sweet
+import csv
+import io
+import json
+import uuid
+
+client = TestClient(app)
+
+
+def get_admin_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def get_user_headers():
+    user_data = {
+        "username": "bulkuser",
+        "email": "bulk@example.com",
+        "password": "bulkpass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "bulk@example.com",
+            "password": "bulkpass123"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def sweets_named(prefix):
+    db = SessionLocal()
+    sweets = {
+        sweet.name: (sweet.category, sweet.price, sweet.quantity)
+        for sweet in db.query(Sweet).filter(Sweet.name.like(f"{prefix}%"))
+    }
+    db.close()
+    return sweets
+
+
+def delete_named(prefix):
+    db = SessionLocal()
+    db.query(Sweet).filter(Sweet.name.like(f"{prefix}%")).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def test_import_csv_upserts_by_name():
+    auth_headers = get_admin_headers()
+    tag = f"Bulk {uuid.uuid4().hex[:8]}"
+    try:
+        response = client.post(
+            "/api/sweets/create",
+            json={"name": f"{tag} Fudge", "category": "Fudge", "price": 2.0, "quantity": 1},
+            headers=auth_headers,
+        )
+        fudge_id = response.json()["id"]
+        # Cached before the import overwrites it
+        client.get(f"/api/sweets/{fudge_id}", headers=auth_headers)
+
+        body = (
+            "name,category,price,quantity\n"
+            f"{tag} Fudge,Fudge,2.5,40\n"
+            f"{tag} Toffee,Toffee,1.5,10\n"
+            f"{tag} Broken,Toffee,not-a-price,10\n"
+            f"{tag} Toffee,Toffee,1.75,12\n"
+        )
+        response = client.post(
+            "/api/sweets/import",
+            content=body,
+            headers={**auth_headers, "Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert (result["inserted"], result["updated"], result["invalid"]) == (1, 1, 1)
+        assert result["errors"][0]["line"] == 4
+        assert sweets_named(tag) == {
+            f"{tag} Fudge": ("Fudge", 2.5, 40),
+            f"{tag} Toffee": ("Toffee", 1.75, 12),
+        }
+
+        response = client.get(f"/api/sweets/{fudge_id}", headers=auth_headers)
+        assert response.json()["quantity"] == 40
+    finally:
+        delete_named(tag)
+
+
+def test_import_ndjson_skip_existing():
+    auth_headers = get_admin_headers()
+    tag = f"Bulk {uuid.uuid4().hex[:8]}"
+    try:
+        lines = [
+            {"name": f"{tag} Ladoo", "category": "Indian", "price": 3.0, "quantity": 5},
+            {"name": f"{tag} Barfi", "category": "Indian", "price": 4.0, "quantity": 6},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines) + "\n{oops\n"
+        response = client.post(
+            "/api/sweets/import",
+            params={"format": "ndjson"},
+            content=body,
+            headers=auth_headers,
+        )
+        assert response.json()["inserted"] == 2
+        assert response.json()["errors"][0]["line"] == 3
+
+        lines[0]["quantity"] = 99
+        response = client.post(
+            "/api/sweets/import",
+            params={"on_conflict": "skip"},
+            content=json.dumps(lines[0]),
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+        )
+        assert response.json()["skipped"] == 1
+        assert sweets_named(f"{tag} Ladoo")[f"{tag} Ladoo"][2] == 5
+    finally:
+        delete_named(tag)
+
+
+def test_export_streams_the_catalog():
+    auth_headers = get_admin_headers()
+    tag = f"Bulk {uuid.uuid4().hex[:8]}"
+    try:
+        body = "name,category,price,quantity\n" + "".join(
+            f"{tag} {n},Export,1.0,{n}\n" for n in range(5)
+        )
+        client.post(
+            "/api/sweets/import",
+            content=body,
+            headers={**auth_headers, "Content-Type": "text/csv"},
+        )
+
+        response = client.get("/api/sweets/export", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        exported = {row["name"]: int(row["quantity"]) for row in rows if row["name"].startswith(tag)}
+        assert exported == {f"{tag} {n}": n for n in range(5)}
+
+        response = client.get("/api/sweets/export", params={"format": "ndjson"}, headers=auth_headers)
+        names = [json.loads(line)["name"] for line in response.text.splitlines()]
+        assert [name for name in names if name.startswith(tag)] == [f"{tag} {n}" for n in range(5)]
+    finally:
+        delete_named(tag)
+
+
+def test_bulk_endpoints_require_admin():
+    user_headers = get_user_headers()
+
+    response = client.get("/api/sweets/export", headers=user_headers)
+    assert response.status_code == 403
+
+    response = client.post(
+        "/api/sweets/import",
+        content="name,category,price,quantity\n",
+        headers={**user_headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 403
+
+
+def test_import_rejects_unknown_format():
+    response = client.post(
+        "/api/sweets/import",
+        content="<sweets/>",
+        headers={**get_admin_headers(), "Content-Type": "application/xml"},
+    )
+    assert response.status_code == 415
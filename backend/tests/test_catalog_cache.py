@@ -0,0 +1,198 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlalchemy.util.concurrency import greenlet_spawn
+from app.main import app
+from app.catalog_cache import CatalogCache, MemoryBackend, ThreadpoolBackend, catalog_cache
+from app.database import SessionLocal, active_engine
+from app.models import Sweet
+import anyio
+import threading
+import uuid
+
+client = TestClient(app)
+
+
+class FakeRedis:
+    """Stands in for redis.Redis: bytes values, string keys."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def incr(self, key):
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+
+def get_auth_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_sweet(auth_headers):
+    sweet_data = {
+        "name": f"Cached Caramel {uuid.uuid4()}",
+        "category": "Caramel",
+        "price": 2.0,
+        "quantity": 10
+    }
+    response = client.post("/api/sweets/create", json=sweet_data, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_cached_reads_skip_the_database():
+    auth_headers = get_auth_headers()
+    sweet_id = create_sweet(auth_headers)
+    first = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    hits = catalog_cache.hits
+    engine = active_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        second = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert second.json() == first.json()
+    assert catalog_cache.hits == hits + 1
+    assert statements == []
+
+
+def test_writes_invalidate_cached_reads():
+    auth_headers = get_auth_headers()
+    sweet_id = create_sweet(auth_headers)
+
+    assert client.get(f"/api/sweets/{sweet_id}", headers=auth_headers).json()["quantity"] == 10
+    listing = client.get("/api/sweets", params={"limit": 1000}, headers=auth_headers).json()
+    assert sweet_id in [sweet["id"] for sweet in listing]
+
+    client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 4}, headers=auth_headers)
+    assert client.get(f"/api/sweets/{sweet_id}", headers=auth_headers).json()["quantity"] == 6
+
+    client.post(f"/api/sweets/{sweet_id}/restock", json={"quantity": 1}, headers=auth_headers)
+    listing = client.get("/api/sweets", params={"limit": 1000}, headers=auth_headers).json()
+    assert [sweet["quantity"] for sweet in listing if sweet["id"] == sweet_id] == [7]
+
+    client.delete(f"/api/sweets/{sweet_id}", headers=auth_headers)
+    assert client.get(f"/api/sweets/{sweet_id}", headers=auth_headers).status_code == 404
+    listing = client.get("/api/sweets", params={"limit": 1000}, headers=auth_headers).json()
+    assert sweet_id not in [sweet["id"] for sweet in listing]
+
+
+def test_read_racing_a_write_is_not_cached():
+    auth_headers = get_auth_headers()
+    sweet_id = create_sweet(auth_headers)
+    raced = []
+
+    def write_meanwhile(conn, cursor, statement, parameters, context, executemany):
+        # The read has fetched the row; a write's invalidation runs before
+        # the read gets to cache it
+        if raced or not statement.startswith("SELECT") or "FROM sweets" not in statement:
+            return
+        raced.append(statement)
+        catalog_cache.invalidate(sweet_id)
+
+    engine = active_engine()
+    event.listen(engine, "after_cursor_execute", write_meanwhile)
+    try:
+        racing = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers)
+    finally:
+        event.remove(engine, "after_cursor_execute", write_meanwhile)
+    assert raced
+    assert racing.json()["quantity"] == 10
+
+    # The write itself, committed only now so SQLite isn't asked for a
+    # second lock mid-read, and without invalidating: only an entry cached
+    # by the racing read could hide it
+    db = SessionLocal()
+    try:
+        db.execute(update(Sweet).where(Sweet.id == sweet_id).values(quantity=3))
+        db.commit()
+    finally:
+        db.close()
+    assert client.get(f"/api/sweets/{sweet_id}", headers=auth_headers).json()["quantity"] == 3
+
+
+def test_clear_retires_keys_taken_before_it():
+    cache = CatalogCache(MemoryBackend(max_size=100, ttl=30), ttl=30)
+    cache.drop(1)
+    sweet_key = cache.sweet_key(1, cache.sweet_version(1))
+    list_key = cache.list_key("sweets", limit=10)
+
+    # A reconnect or an oversized broadcast lands while those reads run;
+    # they finish and store, then the sweet changes again
+    cache.backend.clear()
+    cache.store(sweet_key, b'{"id": 1}')
+    cache.store(list_key, b'[{"id": 1}]')
+    cache.drop(1)
+
+    assert cache.sweet_version(1) == 2
+    assert cache.get(cache.sweet_key(1, cache.sweet_version(1))) is None
+    assert cache.get(cache.list_key("sweets", limit=10)) is None
+
+
+def test_redis_compatible_backend():
+    cache = CatalogCache(FakeRedis(), ttl=30)
+
+    key = cache.list_key("sweets", limit=10)
+    assert cache.get(key) is None
+    cache.store(key, b'[{"id": 1}]', {"X-Next-Cursor": "abc"})
+
+    cached = cache.get(key)
+    assert cached.body == b'[{"id": 1}]'
+    assert cached.headers["X-Next-Cursor"] == "abc"
+
+    cache.store(cache.sweet_key(1, cache.sweet_version(1)), b'{"id": 1}')
+    cache.invalidate(1)
+
+    assert cache.get(cache.sweet_key(1, 0)) is None
+    assert cache.get(cache.sweet_key(1, cache.sweet_version(1))) is None
+    assert cache.get(cache.list_key("sweets", limit=10)) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_blocking_backend_runs_off_the_event_loop():
+    threads = []
+
+    class RecordingRedis(FakeRedis):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+    cache = CatalogCache(ThreadpoolBackend(RecordingRedis()), ttl=30)
+
+    async def handler():
+        # How the async routers run the sync handlers
+        return await greenlet_spawn(cache.get, "sweet:1:0")
+
+    assert anyio.run(handler) is None
+    assert cache.get("sweet:1:0") is None
+    # On the threadpool under the event loop, inline on a plain thread
+    assert threads[0] != threading.get_ident()
+    assert threads[1] == threading.get_ident()
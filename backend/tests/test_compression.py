@@ -0,0 +1,114 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.main import app
+from app.middleware import CompressionMiddleware, accepted_encodings
+import brotli
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    assert login_response.headers["cache-control"] == "no-store"
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, GZIP;q=0.5") == {"gzip"}
+    assert accepted_encodings("") == set()
+
+
+def test_brotli_round_trip():
+    text = "".join(f"sweet {n}\n" for n in range(500))
+    small = FastAPI()
+
+    @small.get("/whole")
+    def whole():
+        return PlainTextResponse(text, headers={"ETag": '"abc"'})
+
+    @small.get("/streamed")
+    def streamed():
+        return StreamingResponse(iter(text.splitlines(keepends=True)), media_type="text/plain")
+
+    small.add_middleware(CompressionMiddleware, minimum_size=100)
+    small_client = TestClient(small)
+
+    for path in ("/whole", "/streamed"):
+        with small_client.stream("GET", path, headers={"Accept-Encoding": "gzip, br"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert len(raw) < len(text)
+        assert brotli.decompress(raw).decode() == text
+    assert response.headers.get("etag") is None
+    response = small_client.get("/whole", headers={"Accept-Encoding": "br"})
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.text == text
+
+    # Refused with q=0, gzip is used instead
+    response = small_client.get("/whole", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == text
+
+
+def test_catalog_responses_are_compressed_and_cacheable():
+    auth_headers = get_auth_headers()
+    tag = uuid.uuid4().hex[:8]
+    for n in range(20):
+        response = client.post("/api/sweets/create", json={
+            "name": f"Squeezed {tag} {n}", "category": "Compressed", "price": 1.25, "quantity": n
+        }, headers=auth_headers)
+        assert response.status_code == 200
+    sweet_id = response.json()["id"]
+
+    response = client.get(
+        "/api/sweets/search", params={"name": tag, "limit": 20},
+        headers={**auth_headers, "Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 20
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == "private, no-cache"
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert int(response.headers["content-length"]) < len(response.content)
+
+    # The weak tag still revalidates
+    response = client.get(
+        "/api/sweets/search", params={"name": tag, "limit": 20},
+        headers={**auth_headers, "Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = client.get(
+        "/api/sweets/search", params={"name": tag, "limit": 20},
+        headers={**auth_headers, "Accept-Encoding": "identity"},
+    )
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == etag.removeprefix("W/")
+
+    # Below the size threshold nothing is compressed
+    response = client.get(f"/api/sweets/{sweet_id}", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    # Writes and errors get no caching policy
+    response = client.get("/api/sweets/999999999", headers=auth_headers)
+    assert response.status_code == 404
+    assert "cache-control" not in response.headers
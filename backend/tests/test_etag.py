@@ -0,0 +1,98 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.catalog_cache import catalog_cache
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    user_data = {
+        "username": "etaguser",
+        "email": "etag@example.com",
+        "password": "etagpass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "etag@example.com",
+            "password": "etagpass123"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_sweet(auth_headers):
+    sweet_data = {
+        "name": f"Etag Eclair {uuid.uuid4()}",
+        "category": "Pastry",
+        "price": 3.0,
+        "quantity": 10
+    }
+    response = client.post("/api/sweets/create", json=sweet_data, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_conditional_get_sweet():
+    auth_headers = get_auth_headers()
+    sweet_id = create_sweet(auth_headers)
+
+    response = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers)
+    etag = response.headers["ETag"]
+    assert etag == catalog_cache.sweet_etag(sweet_id)
+
+    response = client.get(
+        f"/api/sweets/{sweet_id}",
+        headers={**auth_headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    # A purchase changes the sweet, so the old tag no longer matches
+    client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 1}, headers=auth_headers)
+
+    response = client.get(
+        f"/api/sweets/{sweet_id}",
+        headers={**auth_headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 9
+    assert response.headers["ETag"] != etag
+
+    # A cached copy is served with the sweet's current tag
+    response = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers)
+    assert response.json()["quantity"] == 9
+    assert response.headers["ETag"] == catalog_cache.sweet_etag(sweet_id)
+
+
+def test_conditional_get_sweets_list():
+    auth_headers = get_auth_headers()
+    create_sweet(auth_headers)
+
+    response = client.get("/api/sweets", headers=auth_headers)
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/sweets", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Different query, different representation
+    response = client.get(
+        "/api/sweets",
+        params={"limit": 5},
+        headers={**auth_headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+
+    create_sweet(auth_headers)
+
+    response = client.get("/api/sweets", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
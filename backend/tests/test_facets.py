@@ -0,0 +1,165 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from app.main import app
+from app.database import SessionLocal
+from app.models import CategoryStats, Sweet
+from app import facets
+from app.catalog_cache import catalog_cache
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def aggregate_from_sweets(prefix=""):
+    """What the facets should say, computed the slow way."""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(
+                Sweet.category, func.count(), func.sum(Sweet.quantity),
+                func.min(Sweet.price), func.max(Sweet.price), func.avg(Sweet.price),
+            )
+            .filter(Sweet.category.like(f"{prefix}%"))
+            .group_by(Sweet.category)
+            .order_by(Sweet.category)
+            .all()
+        )
+    finally:
+        db.close()
+    return [
+        {
+            "category": category, "sweets": count, "in_stock": in_stock,
+            "min_price": min_price, "max_price": max_price, "avg_price": round(avg_price, 2),
+        }
+        for category, count, in_stock, min_price, max_price, avg_price in rows
+    ]
+
+
+def get_facets(auth_headers):
+    # What the background thread would do within facets_flush_ms
+    facets.stats.flush()
+    response = client.get("/api/sweets/facets", headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def assert_consistent(auth_headers, prefix=""):
+    # Other tests clean up with direct deletes, which skip the stats, so
+    # compare only the categories this test owns
+    body = get_facets(auth_headers)
+    categories = [row for row in body["categories"] if row["category"].startswith(prefix)]
+    assert categories == aggregate_from_sweets(prefix)
+    return {row["category"]: row for row in categories}
+
+
+def test_facets_follow_writes():
+    auth_headers = get_auth_headers()
+    tag = uuid.uuid4().hex[:8]
+    prefix = f"Facet {tag}"
+    toffee, fudge = f"{prefix} Toffee", f"{prefix} Fudge"
+
+    created = []
+    for price, quantity in ((1.0, 10), (3.0, 5), (2.0, 0)):
+        response = client.post("/api/sweets/create", json={
+            "name": f"Facet Sweet {uuid.uuid4()}", "category": toffee, "price": price, "quantity": quantity
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        created.append(response.json())
+
+    stats = assert_consistent(auth_headers, prefix)[toffee]
+    assert stats == {
+        "category": toffee, "sweets": 3, "in_stock": 15, "min_price": 1.0, "max_price": 3.0, "avg_price": 2.0
+    }
+
+    first, second, third = created
+    assert client.post(f"/api/sweets/{first['id']}/purchase", json={"quantity": 4}, headers=auth_headers).status_code == 200
+    assert client.post("/api/sweets/purchase/batch", json={"items": [
+        {"sweet_id": first["id"], "quantity": 1}, {"sweet_id": second["id"], "quantity": 2}
+    ]}, headers=auth_headers).status_code == 200
+    assert client.post(f"/api/sweets/{third['id']}/restock", json={"quantity": 7}, headers=auth_headers).status_code == 200
+    assert client.post("/api/sweets/restock/batch", json={"items": [
+        {"sweet_id": first["id"], "quantity": 1}, {"sweet_id": 999999999, "quantity": 1}
+    ]}, headers=auth_headers).status_code == 200
+    assert assert_consistent(auth_headers, prefix)[toffee]["in_stock"] == 15 - 4 - 3 + 7 + 1
+
+    # Moving the most expensive sweet out updates both categories
+    response = client.put(f"/api/sweets/{second['id']}", json={
+        "name": second["name"], "category": fudge, "price": 4.5, "quantity": 1
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    stats = assert_consistent(auth_headers, prefix)
+    assert stats[toffee]["max_price"] == 2.0
+    assert stats[fudge]["sweets"] == 1
+
+    response = client.put("/api/sweets", json={
+        "name": third["name"], "category": fudge, "price": 0.5, "quantity": 2
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    stats = assert_consistent(auth_headers, prefix)
+    assert stats[fudge]["min_price"] == 0.5
+
+    response = client.post(
+        "/api/sweets/import?format=ndjson",
+        content=f'{{"name": "Facet Import {tag}", "category": "{toffee}", "price": 9.0, "quantity": 3}}\n',
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert assert_consistent(auth_headers, prefix)[toffee]["max_price"] == 9.0
+
+    # Deleting the last sweet of a category drops it
+    assert client.delete(f"/api/sweets/{second['id']}", headers=auth_headers).status_code == 200
+    assert client.delete(f"/api/sweets/{third['id']}", headers=auth_headers).status_code == 200
+    assert fudge not in assert_consistent(auth_headers, prefix)
+
+
+def test_refresh_rebuilds_everything():
+    auth_headers = get_auth_headers()
+    facets.stats.flush()
+    db = SessionLocal()
+    try:
+        facets.refresh(db)
+        db.commit()
+    finally:
+        db.close()
+    catalog_cache.invalidate()
+    body = get_facets(auth_headers)
+    expected = aggregate_from_sweets()
+    assert body["categories"] == expected
+    assert body["sweets"] == sum(row["sweets"] for row in expected)
+    assert body["in_stock"] == sum(row["in_stock"] for row in expected)
+
+
+def test_flushes_add_up_for_a_new_category():
+    # Two workers' first sweets in the same new category
+    category = f"Facet {uuid.uuid4().hex[:8]} New"
+    first = facets.StatsDeltas(SessionLocal, flush_interval=60)
+    second = facets.StatsDeltas(SessionLocal, flush_interval=60)
+    first.record(None, (category, 2.0, 4))
+    second.record(None, (category, 1.0, 3))
+    second.record(None, (category, 5.0, 0))
+    first.flush()
+    second.flush()
+
+    db = SessionLocal()
+    try:
+        stats = db.get(CategoryStats, category)
+        assert (stats.sweets, stats.in_stock, stats.price_sum, stats.min_price, stats.max_price) == (3, 7, 8.0, 1.0, 5.0)
+        db.delete(stats)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,70 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app import metrics
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_metrics_endpoint():
+    auth_headers = get_auth_headers()
+    route = "/api/sweets/{sweet_id}"
+    before = metrics.REQUESTS.value(method="GET", route=route, status=404)
+    queries_before = metrics.REQUEST_QUERIES.count(route=route)
+
+    response = client.get("/api/sweets/999999999", headers=auth_headers)
+    assert response.status_code == 404
+
+    assert metrics.REQUESTS.value(method="GET", route=route, status=404) == before + 1
+    assert metrics.REQUEST_QUERIES.count(route=route) == queries_before + 1
+    assert metrics.PASSWORD_SECONDS.count(op="verify") >= 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert f'http_requests_total{{method="GET",route="{route}",status="404"}}' in body
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/api/auth/login",le="+Inf"}' in body
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in body
+    assert "http_requests_in_flight 1" in body
+
+
+def test_queries_are_attributed_to_the_request():
+    auth_headers = get_auth_headers()
+    route = "/api/sweets/{sweet_id}"
+    total_before = metrics.REQUEST_QUERIES.sum(route=route)
+
+    client.get("/api/sweets/999999999", headers=auth_headers)
+
+    # The lookup that found nothing ran inside the request
+    assert metrics.REQUEST_QUERIES.sum(route=route) >= total_before + 1
+
+
+def test_histogram_rendering():
+    histogram = metrics.Histogram("test_render_seconds", "Test.", ("kind",), buckets=(0.1, 1.0))
+    try:
+        histogram.observe(0.05, kind="a")
+        histogram.observe(0.5, kind="a")
+        histogram.observe(5, kind="a")
+
+        lines = histogram.render().splitlines()
+        assert 'test_render_seconds_bucket{kind="a",le="0.1"} 1' in lines
+        assert 'test_render_seconds_bucket{kind="a",le="1.0"} 2' in lines
+        assert 'test_render_seconds_bucket{kind="a",le="+Inf"} 3' in lines
+        assert 'test_render_seconds_count{kind="a"} 3' in lines
+    finally:
+        metrics.registry.remove(histogram)
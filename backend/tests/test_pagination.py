@@ -0,0 +1,103 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.models import Sweet
+import base64
+import json
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    user_data = {
+        "username": "pageuser",
+        "email": "page@example.com",
+        "password": "pagepass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "page@example.com",
+            "password": "pagepass123"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def walk(auth_headers, sort, limit):
+    ids = []
+    params = {"sort": sort, "limit": limit}
+    while True:
+        response = client.get("/api/sweets", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        ids.extend(sweet["id"] for sweet in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            return ids
+        params["cursor"] = next_cursor
+
+
+def test_cursor_pagination_visits_every_sweet_once():
+    auth_headers = get_auth_headers()
+
+    # Repeated prices so the id tie-breaker matters
+    for price in [4.0, 1.0, 4.0, 2.5, 1.0]:
+        sweet_data = {
+            "name": f"Page Praline {uuid.uuid4()}",
+            "category": "Praline",
+            "price": price,
+            "quantity": 5
+        }
+        response = client.post("/api/sweets/create", json=sweet_data, headers=auth_headers)
+        assert response.status_code == 200
+
+    db = SessionLocal()
+    by_id = [row.id for row in db.query(Sweet.id).order_by(Sweet.id)]
+    by_price = [row.id for row in db.query(Sweet.id).order_by(Sweet.price, Sweet.id)]
+    db.close()
+
+    assert walk(auth_headers, "id", 2) == by_id
+    assert walk(auth_headers, "price", 2) == by_price
+
+
+def test_invalid_cursor():
+    auth_headers = get_auth_headers()
+
+    response = client.get(
+        "/api/sweets",
+        params={"cursor": "not-a-cursor"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+    # A cursor is only valid for the sort order that produced it
+    first_page = client.get("/api/sweets", params={"limit": 1}, headers=auth_headers)
+    response = client.get(
+        "/api/sweets",
+        params={"cursor": first_page.headers["X-Next-Cursor"], "sort": "price"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+    # Forged cursors with values of the wrong type
+    for sort, forged in [
+        ("price", ["price", "abc", {}]),
+        ("price", ["price", 1.5, "7"]),
+        ("name", ["name", 3, 7]),
+        ("id", ["id", True, 7]),
+    ]:
+        cursor = base64.urlsafe_b64encode(json.dumps(forged).encode()).decode().rstrip("=")
+        response = client.get(
+            "/api/sweets",
+            params={"cursor": cursor, "sort": sort},
+            headers=auth_headers,
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,36 @@
+import asyncio
+import time
+from fastapi import HTTPException
+import pytest
+from app.password_pool import PasswordPool, hash_password, check_password
+
+
+def test_hash_and_check_on_pool():
+    async def roundtrip():
+        hashed = await hash_password("poolpass123")
+        return await check_password("poolpass123", hashed), await check_password("wrong", hashed)
+
+    assert asyncio.run(roundtrip()) == (True, False)
+
+
+def test_saturated_pool_rejects_with_503():
+    pool = PasswordPool(workers=1, max_queue=1)
+
+    async def burst():
+        jobs = [pool.run(time.sleep, 0.2) for _ in range(4)]
+        return await asyncio.gather(*jobs, return_exceptions=True)
+
+    try:
+        results = asyncio.run(burst())
+    finally:
+        pool.shutdown()
+
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 2
+    assert all(r.status_code == 503 for r in rejected)
+    assert pool.pending == 0
+
+
+def test_pool_kind_is_validated():
+    with pytest.raises(ValueError):
+        PasswordPool(workers=1, max_queue=1, kind="fiber")
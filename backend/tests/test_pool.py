@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.database import SQLALCHEMY_DATABASE_URL, active_engine
+from sqlalchemy.engine import make_url
+
+client = TestClient(app)
+
+
+def test_pool_status():
+    response = client.get("/health/pool")
+
+    assert response.status_code == 200
+    body = response.json()
+    if settings.db_disable_pool:
+        assert body["pool"] == "NullPool"
+        return
+    if make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() != "postgresql":
+        # SQLite keeps SQLAlchemy's own pool; the sizing settings don't apply
+        assert body["size"] == active_engine().pool.size()
+        assert body["checked_out"] >= 0
+        return
+    assert body["size"] == settings.db_pool_size
+    assert body["max_overflow"] == settings.db_max_overflow
+    assert body["checked_out"] >= 0
+
+
+def test_lifespan_sizes_threadpool():
+    from anyio import to_thread
+
+    with TestClient(app) as lifespan_client:
+        limit = lifespan_client.portal.call(
+            lambda: to_thread.current_default_thread_limiter().total_tokens
+        )
+
+    assert limit == settings.threadpool_size
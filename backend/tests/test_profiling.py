@@ -0,0 +1,111 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import Sweet
+from app.profiling import ProfilingMiddleware, normalize, profiler
+from app.routers import auth, sweets, profiling as profiling_router
+from app import profiling
+import uuid
+
+# Profiling is off by default, so wire it into an app of its own
+app = FastAPI()
+app.add_middleware(ProfilingMiddleware)
+app.include_router(auth.router)
+app.include_router(sweets.router)
+app.include_router(profiling_router.router)
+
+
+@app.get("/n-plus-one")
+def n_plus_one(db: Session = Depends(get_db)):
+    # One lookup per id instead of a single IN query
+    return [db.query(Sweet.name).filter(Sweet.id == sweet_id).scalar() for sweet_id in range(1, 7)]
+
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_normalize_folds_in_lists():
+    assert normalize("SELECT *\n  FROM sweets WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == \
+        "SELECT * FROM sweets WHERE id IN (...)"
+    assert normalize("SELECT * FROM sweets WHERE id IN (?, ?, ?)") == normalize("SELECT * FROM sweets WHERE id IN (?)")
+
+
+def test_sql_profiling(caplog):
+    profiling.enable()
+    slow_query_ms = profiler.slow_query_ms
+    try:
+        auth_headers = get_auth_headers()
+        profiler.reset()
+
+        sweet_data = {
+            "name": f"Profiled Praline {uuid.uuid4()}",
+            "category": "Chocolate",
+            "price": 2.0,
+            "quantity": 3
+        }
+        response = client.post("/api/sweets/create", json=sweet_data, headers=auth_headers)
+        assert response.status_code == 200
+
+        profiler.slow_query_ms = 0
+        with caplog.at_level("WARNING", logger="app.profiling"):
+            assert client.get("/n-plus-one").status_code == 200
+        assert any("Possible N+1 in GET /n-plus-one" in message for message in caplog.messages)
+        assert any("Slow query" in message for message in caplog.messages)
+        profiler.slow_query_ms = slow_query_ms
+
+        response = client.get("/api/profiling/sql", headers=auth_headers)
+        assert response.status_code == 200
+        summary = response.json()
+
+        create = summary["routes"]["POST /api/sweets/create"]
+        assert create["requests"] == 1
+        assert create["statements"] >= 1
+        assert any("INSERT INTO sweets" in entry["sql"] for entry in summary["recent"][0]["statements"])
+
+        loop = summary["routes"]["GET /n-plus-one"]
+        assert loop["n_plus_one_requests"] == 1
+        assert loop["slow_statements"] == loop["statements"]
+        flagged = summary["recent"][1]["n_plus_one"]
+        assert len(flagged) == 1 and flagged[0]["count"] == 6
+        assert any(stats["routes"] == ["GET /n-plus-one"] for stats in summary["top_statements"])
+
+        response = client.delete("/api/profiling/sql", headers=auth_headers)
+        assert response.status_code == 204
+        # Only the DELETE itself, recorded after the reset
+        assert list(profiler.summary()["routes"]) == ["DELETE /api/profiling/sql"]
+    finally:
+        profiler.slow_query_ms = slow_query_ms
+        profiling.disable()
+
+
+def test_sql_profiling_requires_admin():
+    name = f"profuser{uuid.uuid4().hex[:8]}"
+    client.post("/api/auth/register", json={
+        "username": name,
+        "email": f"{name}@example.com",
+        "password": "profpass123"
+    })
+    login_response = client.post(
+        "/api/auth/login",
+        data={"username": f"{name}@example.com", "password": "profpass123"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    token = login_response.json()["access_token"]
+    response = client.get("/api/profiling/sql", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.models import Sweet
+import uuid
+
+client = TestClient(app)
+
+
+def test_concurrent_purchases_do_not_oversell():
+    user_data = {
+        "username": "rushuser",
+        "email": "rush@example.com",
+        "password": "rushpass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "rush@example.com",
+            "password": "rushpass123"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    auth_headers = {"Authorization": f"Bearer {token}"}
+
+    # One hot sweet with less stock than buyers
+    sweet_data = {
+        "name": f"Flash Fudge {uuid.uuid4()}",
+        "category": "Fudge",
+        "price": 3.5,
+        "quantity": 100
+    }
+
+    create_response = client.post(
+        "/api/sweets/create",
+        json=sweet_data,
+        headers=auth_headers,
+    )
+
+    assert create_response.status_code == 200
+    sweet_id = create_response.json()["id"]
+
+    # All buyers on one event loop, as in a server worker: under async_db
+    # pooled connections belong to the loop that opened them
+    with TestClient(app) as loop_client:
+        def buy(_):
+            return loop_client.post(
+                f"/api/sweets/{sweet_id}/purchase",
+                json={"quantity": 1},
+                headers=auth_headers,
+            )
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            responses = list(pool.map(buy, range(300)))
+
+    succeeded = [r for r in responses if r.status_code == 200]
+    rejected = [r for r in responses if r.status_code == 400]
+
+    assert len(succeeded) == 100
+    assert len(rejected) == 200
+    assert all(r.json()["detail"] == "Not enough stock available" for r in rejected)
+    assert sorted(r.json()["quantity"] for r in succeeded) == list(range(100))
+
+    db = SessionLocal()
+    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    db.close()
+
+    assert sweet.quantity == 0
+
+
+def test_purchase_missing_sweet():
+    user_data = {
+        "username": "rushuser",
+        "email": "rush@example.com",
+        "password": "rushpass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "rush@example.com",
+            "password": "rushpass123"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    token = login_response.json()["access_token"]
+
+    response = client.post(
+        "/api/sweets/999999999/purchase",
+        json={"quantity": 1},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 404
@@ -0,0 +1,246 @@
+import math
+import threading
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.middleware import AdmissionMiddleware
+from app.rate_limit import MemoryBuckets, RedisBuckets, parse_rate, rate_limiter
+import pytest
+import uuid
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LuaNumber(float):
+    # Only nil and false are falsy in Lua, so "tonumber(x) or default"
+    # keeps a stored 0
+    def __bool__(self):
+        return True
+
+
+class LuaTable(list):
+    def __getitem__(self, index):
+        return super().__getitem__(index - 1)
+
+
+def lua_to_python(script):
+    """Just enough Lua for REDIS_TAKE: locals, if/else/end, 1-based tables."""
+    lines, depth = ["def script(KEYS, ARGV):"], 1
+    for line in script.strip().splitlines():
+        line = line.strip().removeprefix("local ")
+        if line == "end":
+            depth -= 1
+        elif line == "else":
+            lines.append("    " * (depth - 1) + "else:")
+        elif line.startswith("if ") and line.endswith(" then"):
+            lines.append("    " * depth + line[:-len(" then")] + ":")
+            depth += 1
+        else:
+            lines.append("    " * depth + line)
+    return "\n".join(lines)
+
+
+class FakeRedis:
+    """Runs registered scripts against in-memory hashes and a fake clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.hashes = {}
+        self.expires = {}
+
+    def call(self, command, *args):
+        if command == "TIME":
+            seconds, fraction = divmod(self.clock(), 1)
+            return LuaTable([str(int(seconds)), str(round(fraction * 1_000_000))])
+        if command == "HMGET":
+            key, *fields = args
+            return LuaTable([self.hashes.get(key, {}).get(field) for field in fields])
+        if command == "HSET":
+            key, *pairs = args
+            self.hashes.setdefault(key, {}).update(zip(pairs[::2], map(str, pairs[1::2])))
+            return 0
+        if command == "EXPIRE":
+            self.expires[args[0]] = args[1]
+            return 1
+        raise NotImplementedError(command)
+
+    def register_script(self, script):
+        namespace = {
+            "redis": SimpleNamespace(call=self.call),
+            "math": SimpleNamespace(min=min, ceil=math.ceil),
+            "tonumber": lambda value: None if value is None else LuaNumber(value),
+            "tostring": str,
+        }
+        exec(lua_to_python(script), namespace)
+
+        def run(keys, args):
+            # Redis hands scripts their arguments as strings
+            return namespace["script"](LuaTable(keys), LuaTable(map(str, args)))
+        return run
+
+
+@pytest.fixture
+def limits():
+    """Rate limits on, with fresh buckets on a clock the test controls."""
+    clock = FakeClock()
+    original = rate_limiter.backend
+    overrides = {}
+
+    def configure(**rates):
+        for name, value in rates.items():
+            overrides.setdefault(name, getattr(settings, name))
+            setattr(settings, name, value)
+
+    rate_limiter.backend = MemoryBuckets(clock=clock)
+    settings.rate_limit_enabled = True
+    try:
+        yield clock, configure
+    finally:
+        settings.rate_limit_enabled = False
+        rate_limiter.backend = original
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+
+
+def login(username, password):
+    return client.post(
+        "/api/auth/login",
+        data={"username": username, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+
+def test_parse_rate():
+    assert parse_rate("30/minute") == (30, 60)
+    assert parse_rate("5/second") == (5, 1)
+    with pytest.raises(ValueError):
+        parse_rate("lots/day")
+
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    buckets = MemoryBuckets(clock=clock)
+    assert [buckets.take("k", 3, 60) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("k", 3, 60) == pytest.approx(20)
+    # Other keys have their own bucket
+    assert buckets.take("other", 3, 60) == 0
+    clock.now += 20
+    assert buckets.take("k", 3, 60) == 0
+    assert buckets.take("k", 3, 60) > 0
+
+
+def test_redis_token_bucket_refills_and_rejects():
+    clock = FakeClock()
+    redis = FakeRedis(clock)
+    buckets = RedisBuckets(redis)
+    assert [buckets.take("k", 3, 60) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("k", 3, 60) == pytest.approx(20)
+    assert redis.hashes["ratelimit:k"]["tokens"] == "0.0"
+    assert redis.expires["ratelimit:k"] == 60
+    assert buckets.take("other", 3, 60) == 0
+    clock.now += 20
+    assert buckets.take("k", 3, 60) == 0
+    assert buckets.take("k", 3, 60) == pytest.approx(20)
+    # Idle for longer than a period refills to capacity, no further
+    clock.now += 600
+    assert [buckets.take("k", 3, 60) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("k", 3, 60) > 0
+    # A cost bigger than what is left waits for the difference
+    clock.now += 600
+    assert buckets.take("big", 3, 60, cost=2) == 0
+    assert buckets.take("big", 3, 60, cost=2) == pytest.approx(20)
+
+
+def test_login_is_limited_per_account(limits):
+    clock, configure = limits
+    configure(login_rate_per_account="2/minute", login_rate_per_ip="100/minute")
+    target = f"victim{uuid.uuid4().hex[:8]}@example.com"
+
+    assert login(target, "guess1").status_code == 401
+    assert login(target, "guess2").status_code == 401
+    response = login(target, "guess3")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+
+    # Another account from the same address still gets through
+    assert login("johndoe@john.com", "12345").status_code == 200
+
+    clock.now += 30
+    assert login(target, "guess4").status_code == 401
+
+
+def test_login_is_limited_per_ip(limits):
+    _, configure = limits
+    configure(login_rate_per_ip="3/minute")
+    statuses = [login(f"spray{n}@example.com", "password").status_code for n in range(4)]
+    assert statuses == [401, 401, 401, 429]
+
+
+def test_purchase_is_limited_per_user(limits):
+    response = login("johndoe@john.com", "12345")
+    auth_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = client.post("/api/sweets/create", json={
+        "name": f"Limited Lolly {uuid.uuid4()}", "category": "Lollipop", "price": 1.0, "quantity": 10
+    }, headers=auth_headers)
+    sweet_id = response.json()["id"]
+
+    _, configure = limits
+    configure(purchase_rate_per_user="2/minute")
+    purchase = {"quantity": 1}
+    assert client.post(f"/api/sweets/{sweet_id}/purchase", json=purchase, headers=auth_headers).status_code == 200
+    assert client.post(
+        "/api/sweets/purchase/batch", json={"items": [{"sweet_id": sweet_id, "quantity": 1}]}, headers=auth_headers
+    ).status_code == 200
+    response = client.post(f"/api/sweets/{sweet_id}/purchase", json=purchase, headers=auth_headers)
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+    # The rejected purchase did no work
+    assert client.get(f"/api/sweets/{sweet_id}", headers=auth_headers).json()["quantity"] == 8
+
+
+def test_admission_sheds_excess_requests():
+    release = threading.Event()
+    entered = threading.Event()
+    busy = FastAPI()
+
+    @busy.get("/work")
+    def work():
+        entered.set()
+        release.wait(10)
+        return {"ok": True}
+
+    @busy.get("/health")
+    def health():
+        return {"ok": True}
+
+    admission = AdmissionMiddleware(busy, max_concurrent=1, exempt={"/health"})
+    busy_client = TestClient(admission)
+
+    first = {}
+    worker = threading.Thread(target=lambda: first.update(response=busy_client.get("/work")))
+    worker.start()
+    try:
+        assert entered.wait(10)
+        response = busy_client.get("/work")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert busy_client.get("/health").status_code == 200
+    finally:
+        release.set()
+        worker.join()
+
+    assert first["response"].status_code == 200
+    assert admission.in_flight == 0
+    assert admission.rejected == 1
+    assert busy_client.get("/work").status_code == 200
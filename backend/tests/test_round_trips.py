@@ -0,0 +1,115 @@
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.database import active_engine
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def statements_on(table):
+    """SQL sent to the database during the block that touches ``table``."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if f" {table}" in statement:
+            statements.append(" ".join(statement.split()))
+
+    engine = active_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def create_sweet(auth_headers):
+    response = client.post("/api/sweets/create", json={
+        "name": f"Round Trip Rock {uuid.uuid4()}",
+        "category": "Hard Candy",
+        "price": 0.5,
+        "quantity": 10
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_create_sweet_round_trips():
+    auth_headers = get_auth_headers()
+    with statements_on("sweets") as statements:
+        create_sweet(auth_headers)
+    # Just the INSERT; nothing re-reads the row
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT INTO sweets")
+
+
+def test_update_sweet_round_trips():
+    auth_headers = get_auth_headers()
+    sweet = create_sweet(auth_headers)
+    with statements_on("sweets") as statements:
+        response = client.put(f"/api/sweets/{sweet['id']}", json={
+            "name": sweet["name"],
+            "category": "Boiled Sweets",
+            "price": 0.75,
+            "quantity": 12
+        }, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["category"] == "Boiled Sweets"
+    assert response.json()["quantity"] == 12
+    # One UPDATE, also returning the previous values for the facet stats;
+    # on SQLite those come from a leading WITH
+    assert len(statements) == 1
+    assert "UPDATE sweets" in statements[0]
+
+
+def test_purchase_sweet_round_trips():
+    auth_headers = get_auth_headers()
+    sweet = create_sweet(auth_headers)
+    with statements_on("sweets") as statements:
+        response = client.post(f"/api/sweets/{sweet['id']}/purchase", json={"quantity": 3}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 7
+    assert len(statements) == 1
+
+
+def test_restock_sweet_round_trips():
+    auth_headers = get_auth_headers()
+    sweet = create_sweet(auth_headers)
+    with statements_on("sweets") as statements:
+        response = client.post(f"/api/sweets/{sweet['id']}/restock", json={"quantity": 5}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 15
+    assert len(statements) == 1
+
+
+def test_register_round_trips():
+    name = f"tripuser{uuid.uuid4().hex[:8]}"
+    with statements_on("users") as statements:
+        response = client.post("/api/auth/register", json={
+            "username": name,
+            "email": f"{name}@example.com",
+            "password": "trippass123"
+        })
+    assert response.status_code == 200
+    assert response.json()["email"] == f"{name}@example.com"
+    assert response.json()["id"] > 0
+    # The existing-user check, then the INSERT
+    assert len(statements) == 2
+    assert statements[-1].startswith("INSERT INTO users")
@@ -0,0 +1,104 @@
+from fastapi.testclient import TestClient
+from app.main import app
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    # Admin, so the test can also delete what it creates
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_sweet(auth_headers, name, category, price):
+    sweet_data = {
+        "name": name,
+        "category": category,
+        "price": price,
+        "quantity": 10
+    }
+    response = client.post("/api/sweets/create", json=sweet_data, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_search_by_name_and_category():
+    auth_headers = get_auth_headers()
+    tag = uuid.uuid4().hex[:10]
+
+    truffle_id = create_sweet(auth_headers, f"{tag} Truffle", f"Choc {tag}", 4.0)
+    bar_id = create_sweet(auth_headers, f"{tag} Milk Bar Deluxe Edition", f"Choc {tag}", 2.0)
+    create_sweet(auth_headers, f"{tag} Lemon Drop", f"Hard {tag}", 1.0)
+
+    response = client.get(
+        "/api/sweets/search",
+        params={"category": f"choc {tag}"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert {sweet["id"] for sweet in response.json()} == {truffle_id, bar_id}
+
+    # Closer matches rank first
+    response = client.get(
+        "/api/sweets/search",
+        params={"name": f"{tag} truffle"},
+        headers=auth_headers,
+    )
+    assert [sweet["id"] for sweet in response.json()] == [truffle_id]
+
+    response = client.get(
+        "/api/sweets/search",
+        params={"name": tag, "max_price": 3.0, "category": "choc"},
+        headers=auth_headers,
+    )
+    assert [sweet["id"] for sweet in response.json()] == [bar_id]
+
+    response = client.get(
+        "/api/sweets/search",
+        params={"name": tag, "limit": 2},
+        headers=auth_headers,
+    )
+    assert len(response.json()) == 2
+
+
+def test_search_follows_writes():
+    auth_headers = get_auth_headers()
+    tag = uuid.uuid4().hex[:10]
+    sweet_id = create_sweet(auth_headers, f"{tag} Fudge", "Fudge", 3.0)
+
+    response = client.put(
+        f"/api/sweets/{sweet_id}",
+        json={"name": f"{tag} Nougat", "category": "Nougat", "price": 3.0, "quantity": 10},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+    response = client.get("/api/sweets/search", params={"name": f"{tag} fudge"}, headers=auth_headers)
+    assert response.json() == []
+    response = client.get("/api/sweets/search", params={"name": f"{tag} nougat"}, headers=auth_headers)
+    assert [sweet["id"] for sweet in response.json()] == [sweet_id]
+
+    client.delete(f"/api/sweets/{sweet_id}", headers=auth_headers)
+
+    response = client.get("/api/sweets/search", params={"name": tag}, headers=auth_headers)
+    assert response.json() == []
+
+
+def test_search_treats_wildcards_literally():
+    auth_headers = get_auth_headers()
+
+    response = client.get("/api/sweets/search", params={"name": "%"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert all("%" in sweet["name"] for sweet in response.json())
@@ -0,0 +1,28 @@
+from typing import List
+from pydantic import TypeAdapter
+from app.database import SessionLocal
+from app.models import Sweet
+from app.schemas import SweetResponse
+from app.serialization import SWEET_COLUMNS, dump_sweets
+import uuid
+
+
+def test_dump_sweets_matches_pydantic():
+    db = SessionLocal()
+    try:
+        prefix = f"Encoded Eclair {uuid.uuid4()}"
+        db.add_all([
+            Sweet(name=f"{prefix} plain", category="Pastry", price=2.0, quantity=0),
+            Sweet(name=f'{prefix} "quoted" éclair', category="Pâtisserie", price=0.1 + 0.2, quantity=7),
+        ])
+        db.commit()
+
+        rows = db.query(*SWEET_COLUMNS).filter(Sweet.name.like(f"{prefix}%")).order_by(Sweet.id).all()
+        sweets = db.query(Sweet).filter(Sweet.name.like(f"{prefix}%")).order_by(Sweet.id).all()
+        adapter = TypeAdapter(List[SweetResponse])
+        assert dump_sweets(rows) == adapter.dump_json(adapter.validate_python(sweets, from_attributes=True))
+
+        db.query(Sweet).filter(Sweet.name.like(f"{prefix}%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
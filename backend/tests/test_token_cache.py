@@ -0,0 +1,70 @@
+from datetime import timedelta
+import time
+from fastapi.testclient import TestClient
+from jose import JWTError
+import pytest
+from app.main import app
+from app.utils import create_access_token, decode_access_token, token_cache
+
+client = TestClient(app)
+
+
+def test_decoded_token_is_cached():
+    token = create_access_token(data={"sub": "tokencacheuser"})
+    hits = token_cache.hits
+
+    assert decode_access_token(token)["sub"] == "tokencacheuser"
+    assert decode_access_token(token)["sub"] == "tokencacheuser"
+
+    assert token_cache.hits == hits + 1
+
+
+def test_cached_token_expires_with_token():
+    token = create_access_token(
+        data={"sub": "shortlived"},
+        expires_delta=timedelta(seconds=1),
+    )
+    decode_access_token(token)
+    assert token_cache.get(token) is not None
+
+    time.sleep(2.1)
+
+    assert token_cache.get(token) is None
+    with pytest.raises(JWTError):
+        decode_access_token(token)
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token(
+        data={"sub": "johndoe"},
+        expires_delta=timedelta(seconds=-1),
+    )
+
+    response = client.get(
+        "/api/sweets",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 401
+    assert token_cache.get(token) is None
+
+
+def test_cache_stats_admin_only():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    token = login_response.json()["access_token"]
+
+    response = client.get(
+        "/api/auth/cache/stats",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"users", "tokens", "catalog"}
+    assert "hit_rate" in response.json()["tokens"]
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from app.main import app
+import uuid
+
+client = TestClient(app)
+
+
+def get_auth_headers():
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": "johndoe@john.com",
+            "password": "12345"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def sweet_data(name, **changes):
+    return {"name": name, "category": "Fudge", "price": 1.5, "quantity": 8, **changes}
+
+
+def test_duplicate_names_are_rejected():
+    auth_headers = get_auth_headers()
+    name = f"Unique Fudge {uuid.uuid4()}"
+    response = client.post("/api/sweets/create", json=sweet_data(name), headers=auth_headers)
+    assert response.status_code == 200
+
+    response = client.post("/api/sweets/create", json=sweet_data(name), headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Sweet with this name already exists"
+
+    other = client.post(
+        "/api/sweets/create", json=sweet_data(f"Other Fudge {uuid.uuid4()}"), headers=auth_headers
+    ).json()
+    response = client.put(f"/api/sweets/{other['id']}", json=sweet_data(name), headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Sweet with this name already exists"
+
+    response = client.put("/api/sweets/999999999", json=sweet_data(f"Ghost Fudge {uuid.uuid4()}"), headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_concurrent_creates_admit_one():
+    auth_headers = get_auth_headers()
+    name = f"Race Fudge {uuid.uuid4()}"
+
+    def create(_):
+        return client.post("/api/sweets/create", json=sweet_data(name), headers=auth_headers).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = sorted(pool.map(create, range(8)))
+
+    assert statuses == [200] + [400] * 7
+
+
+def test_upsert_sweet():
+    auth_headers = get_auth_headers()
+    name = f"Upsert Fudge {uuid.uuid4()}"
+
+    response = client.put("/api/sweets", json=sweet_data(name), headers=auth_headers)
+    assert response.status_code == 200
+    created = response.json()
+    assert created["quantity"] == 8
+
+    response = client.put("/api/sweets", json=sweet_data(name, price=2.5, quantity=3), headers=auth_headers)
+    assert response.status_code == 200
+    updated = response.json()
+    assert updated["id"] == created["id"]
+    assert updated["price"] == 2.5
+    assert updated["quantity"] == 3
+
+    response = client.get(f"/api/sweets/{created['id']}", headers=auth_headers)
+    assert response.json()["quantity"] == 3
@@ -0,0 +1,112 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from app.main import app
+from app.database import SessionLocal, active_engine
+from app.models import User
+from app.utils import invalidate_user
+import uuid
+
+client = TestClient(app)
+
+
+def register_and_login():
+    name = f"cacheuser{uuid.uuid4().hex[:8]}"
+    user_data = {
+        "username": name,
+        "email": f"{name}@example.com",
+        "password": "cachepass123"
+    }
+    client.post("/api/auth/register", json=user_data)
+
+    login_response = client.post(
+        "/api/auth/login",
+        data={
+            "username": f"{name}@example.com",
+            "password": "cachepass123"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    assert login_response.status_code == 200
+    token = login_response.json()["access_token"]
+    return name, {"Authorization": f"Bearer {token}"}
+
+
+def test_repeated_requests_skip_user_lookup():
+    _, auth_headers = register_and_login()
+    client.get("/api/sweets", headers=auth_headers)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = active_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for _ in range(5):
+            response = client.get("/api/sweets", headers=auth_headers)
+            assert response.status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert not [s for s in statements if "FROM users" in s]
+
+
+def test_user_change_invalidates_cache():
+    name, auth_headers = register_and_login()
+
+    # Cache the user as a non-admin
+    response = client.delete("/api/sweets/999999999", headers=auth_headers)
+    assert response.status_code == 403
+
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == name).first()
+    user.is_admin = 1
+    db.commit()
+    db.close()
+
+    # Promotion is visible straight away, not after the TTL
+    response = client.delete("/api/sweets/999999999", headers=auth_headers)
+    assert response.status_code == 404
+
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == name).first()
+    db.delete(user)
+    db.commit()
+    db.close()
+
+    response = client.get("/api/sweets", headers=auth_headers)
+    assert response.status_code == 401
+
+
+def test_lookup_racing_a_change_is_not_cached():
+    name, auth_headers = register_and_login()
+    raced = []
+
+    def change_meanwhile(conn, cursor, statement, parameters, context, executemany):
+        # The lookup has fetched the user; a change commits and invalidates
+        # before the lookup gets to cache it
+        if raced or "FROM users" not in statement:
+            return
+        raced.append(statement)
+        invalidate_user(name)
+
+    engine = active_engine()
+    event.listen(engine, "after_cursor_execute", change_meanwhile)
+    try:
+        response = client.delete("/api/sweets/999999999", headers=auth_headers)
+    finally:
+        event.remove(engine, "after_cursor_execute", change_meanwhile)
+    assert raced
+    assert response.status_code == 403
+
+    # The change itself, written without invalidating, so only an entry
+    # cached by the racing lookup could hide it
+    db = SessionLocal()
+    db.execute(update(User).where(User.username == name).values(is_admin=1))
+    db.commit()
+    db.close()
+
+    response = client.delete("/api/sweets/999999999", headers=auth_headers)
+    assert response.status_code == 404
@@ -0,0 +1,190 @@
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy.engine import make_url
+
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.config import settings
+from app.invalidation import MAX_PAYLOAD, Broadcaster, LocalChannel, default_socket_dir, resolve_channel
+from app.serve import configure
+
+ON_POSTGRES = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "postgresql"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(params=[
+    pytest.param("postgres", marks=pytest.mark.skipif(not ON_POSTGRES, reason="needs PostgreSQL")),
+    "local",
+])
+def workers(request):
+    port = free_port()
+    env = dict(
+        os.environ,
+        INVALIDATION_CHANNEL=request.param,
+        RATE_LIMIT_ENABLED="false",
+        WORKER_PID_HEADER="true",
+    )
+    # app.serve gives its workers a socket directory of their own
+    env.pop("INVALIDATION_SOCKET_DIR", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", "2", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(200):
+            try:
+                httpx.get(f"{base_url}/", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def pin_workers(base_url, count=2):
+    """One keep-alive client per worker, told apart by X-Worker-PID."""
+    clients = {}
+    deadline = time.monotonic() + 10
+    while len(clients) < count:
+        assert time.monotonic() < deadline, f"reached only workers {sorted(clients)}"
+        client = httpx.Client(base_url=base_url)
+        pid = client.get("/").headers["x-worker-pid"]
+        if pid in clients:
+            client.close()
+        else:
+            clients[pid] = client
+    return clients
+
+
+def read(client, headers, sweet_id, name):
+    sweet = client.get(f"/api/sweets/{sweet_id}", headers=headers)
+    found = client.get("/api/sweets/search", params={"name": name}, headers=headers)
+    # Each client keeps its connection, so one worker answers both
+    assert sweet.headers["x-worker-pid"] == found.headers["x-worker-pid"]
+    return sweet.json(), [row["id"] for row in found.json()]
+
+
+def test_reads_stay_consistent_across_workers(workers):
+    login = httpx.post(
+        f"{workers}/api/auth/login",
+        data={"username": "johndoe@john.com", "password": "12345"},
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    old_name = f"Worker Toffee {uuid.uuid4().hex}"
+    new_name = f"Renamed Toffee {uuid.uuid4().hex}"
+    created = httpx.post(
+        f"{workers}/api/sweets/create",
+        json={"name": old_name, "category": "Toffee", "price": 1.0, "quantity": 5},
+        headers=headers,
+    ).json()
+    sweet_id = created["id"]
+    clients = pin_workers(workers)
+
+    try:
+        # Every worker caches the sweet and indexes it for search
+        for pid, client in clients.items():
+            sweet, found = read(client, headers, sweet_id, old_name)
+            assert sweet["price"] == 1.0 and found == [sweet_id], pid
+            # Now from the cache
+            assert read(client, headers, sweet_id, old_name) == (sweet, found)
+
+        response = httpx.put(
+            f"{workers}/api/sweets/{sweet_id}",
+            json={"name": new_name, "category": "Toffee", "price": 2.5, "quantity": 5},
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+        # Broadcasts are asynchronous: a worker may answer from its old copy
+        # until one arrives, but not after
+        deadline = time.monotonic() + 2
+        for pid, client in clients.items():
+            while True:
+                sweet, found = read(client, headers, sweet_id, new_name)
+                if sweet["price"] == 2.5 and found == [sweet_id]:
+                    break
+                assert time.monotonic() < deadline, f"worker {pid} kept serving the old sweet"
+                time.sleep(0.01)
+        for pid, client in clients.items():
+            for _ in range(5):
+                sweet, found = read(client, headers, sweet_id, new_name)
+                assert sweet["name"] == new_name and sweet["price"] == 2.5, pid
+                assert found == [sweet_id], pid
+                assert read(client, headers, sweet_id, old_name)[1] == [], pid
+    finally:
+        for client in clients.values():
+            client.close()
+        httpx.delete(f"{workers}/api/sweets/{sweet_id}", headers=headers)
+
+
+def test_broadcasts_coalesce_and_overflow(tmp_path):
+    sender, receiver = Broadcaster(), Broadcaster()
+    received = []
+    receiver.register("catalog", received.append)
+
+    payloads = sender.encode({"catalog": {None: None, 1: None, 2: None}})
+    for payload in payloads:
+        receiver.deliver(payload)
+    # A worker ignores its own messages
+    for payload in payloads:
+        sender.deliver(payload)
+    too_big = sender.encode({"catalog": {n: None for n in range(MAX_PAYLOAD)}})
+    receiver.deliver(too_big[0])
+
+    assert received == [{None: None, 1: None, 2: None}, None]
+
+
+def test_local_channel_reaches_other_sockets(tmp_path):
+    first, second = LocalChannel(str(tmp_path)), LocalChannel(str(tmp_path))
+    try:
+        first.send('{"hello": 1}')
+        assert second.sock.recv(1024) == b'{"hello": 1}'
+    finally:
+        first.close()
+        second.close()
+
+
+def test_postgres_channel_needs_postgresql():
+    assert resolve_channel("auto", "sqlite:///./sweets.db") == "local"
+    with pytest.raises(ValueError, match="needs a PostgreSQL database"):
+        resolve_channel("postgres", "sqlite:///./sweets.db")
+
+
+def test_launchers_get_their_own_socket_dir(monkeypatch):
+    monkeypatch.setattr(settings, "invalidation_channel", "none")
+    monkeypatch.setattr(settings, "invalidation_socket_dir", "")
+    monkeypatch.setattr(settings, "bootstrap_on_startup", False)
+    monkeypatch.setattr(settings, "purchase_write_behind", False)
+    # configure() exports these for the workers; put them back afterwards
+    for name in ("BOOTSTRAP_ON_STARTUP", "INVALIDATION_CHANNEL", "INVALIDATION_SOCKET_DIR"):
+        monkeypatch.setenv(name, os.environ.get(name, ""))
+
+    first = configure(2)
+    monkeypatch.setattr(settings, "invalidation_socket_dir", "")
+    second = configure(2)
+    try:
+        assert os.path.isdir(first) and os.path.isdir(second)
+        assert first != second
+        assert os.environ["INVALIDATION_SOCKET_DIR"] == settings.invalidation_socket_dir == second
+    finally:
+        shutil.rmtree(first)
+        shutil.rmtree(second)
+
+    # Without app.serve, deployments on other databases stay apart too
+    assert default_socket_dir("sqlite:///./a.db") != default_socket_dir("sqlite:///./b.db")
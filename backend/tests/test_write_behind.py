@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Sweet, WriteBehindCheckpoint
+from app import write_behind
+from app.write_behind import OutOfStock, WriteBehindStock
+import os
+import tempfile
+import uuid
+
+client = TestClient(app)
+
+
+def new_stock(journal_dir):
+    return WriteBehindStock(SessionLocal, os.path.join(journal_dir, "purchases.journal"), flush_interval=0.01)
+
+
+def create_sweet(quantity):
+    db = SessionLocal()
+    sweet = Sweet(name=f"Flash Sale {uuid.uuid4()}", category="Promo", price=1.0, quantity=quantity)
+    db.add(sweet)
+    db.commit()
+    sweet_id = sweet.id
+    db.close()
+    return sweet_id
+
+
+def quantity_of(sweet_id):
+    db = SessionLocal()
+    quantity = db.query(Sweet.quantity).filter(Sweet.id == sweet_id).scalar()
+    db.close()
+    return quantity
+
+
+def drop_checkpoint(stock):
+    db = SessionLocal()
+    db.query(WriteBehindCheckpoint).filter(WriteBehindCheckpoint.journal == stock.journal_path).delete()
+    db.commit()
+    db.close()
+
+
+def test_write_behind_never_oversells():
+    stock_units = 150
+    sweet_id = create_sweet(stock_units)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        stock = new_stock(journal_dir)
+        try:
+            def buy(_):
+                try:
+                    stock.reserve({sweet_id: 1})
+                    return 1
+                except OutOfStock:
+                    return 0
+
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                sold = sum(pool.map(buy, range(600)))
+        finally:
+            stock.stop()
+            drop_checkpoint(stock)
+
+    assert sold == stock_units
+    assert quantity_of(sweet_id) == 0
+
+
+def test_write_behind_recovers_unflushed_purchases():
+    sweet_id = create_sweet(20)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        stock = new_stock(journal_dir)
+        # Never let the background thread flush, then "crash"
+        stock.flush_interval = 3600
+        try:
+            stock.reserve({sweet_id: 3})
+            stock.reserve({sweet_id: 4})
+            os.close(stock._fd)
+            assert quantity_of(sweet_id) == 20
+
+            restarted = new_stock(journal_dir)
+            assert restarted.recover() == 7
+            assert quantity_of(sweet_id) == 13
+
+            # Replaying again must not apply anything twice
+            assert new_stock(journal_dir).recover() == 0
+            assert quantity_of(sweet_id) == 13
+        finally:
+            stock._stop.set()
+            drop_checkpoint(stock)
+
+
+def test_write_behind_purchase_endpoint():
+    login_response = client.post(
+        "/api/auth/login",
+        data={"username": "johndoe@john.com", "password": "12345"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    auth_headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    sweet_id = create_sweet(5)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        original = write_behind.stock
+        write_behind.stock = new_stock(journal_dir)
+        settings.purchase_write_behind = True
+        try:
+            response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 4}, headers=auth_headers)
+            assert response.status_code == 200
+            assert response.json()["quantity"] == 1
+
+            response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 2}, headers=auth_headers)
+            assert response.status_code == 400
+
+            # A restock goes to the database and reseeds the counter
+            response = client.post(f"/api/sweets/{sweet_id}/restock", json={"quantity": 10}, headers=auth_headers)
+            assert response.status_code == 200
+            response = client.post(
+                "/api/sweets/purchase/batch",
+                json={"items": [{"sweet_id": sweet_id, "quantity": 11}]},
+                headers=auth_headers,
+            )
+            assert response.json()[0]["quantity"] == 0
+
+            response = client.post("/api/sweets/999999999/purchase", json={"quantity": 1}, headers=auth_headers)
+            assert response.status_code == 404
+        finally:
+            settings.purchase_write_behind = False
+            write_behind.stock.stop()
+            drop_checkpoint(write_behind.stock)
+            write_behind.stock = original
+
+    assert quantity_of(sweet_id) == 0
+
+
+def test_write_behind_overwrite_replaces_pending_purchases():
+    login_response = client.post(
+        "/api/auth/login",
+        data={"username": "johndoe@john.com", "password": "12345"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    auth_headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    sweet_id = create_sweet(10)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        original = write_behind.stock
+        write_behind.stock = new_stock(journal_dir)
+        # Only the requests below flush
+        write_behind.stock.flush_interval = 3600
+        settings.purchase_write_behind = True
+        try:
+            response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 8}, headers=auth_headers)
+            assert response.json()["quantity"] == 2
+
+            sweet = client.get(f"/api/sweets/{sweet_id}", headers=auth_headers).json()
+            response = client.put(f"/api/sweets/{sweet_id}", json={
+                "name": sweet["name"], "category": "Promo", "price": 1.0, "quantity": 3
+            }, headers=auth_headers)
+            assert response.json()["quantity"] == 3
+            write_behind.stock.flush()
+            assert quantity_of(sweet_id) == 3
+
+            # Restocks add to the counter, pending purchases and all
+            response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 2}, headers=auth_headers)
+            assert response.json()["quantity"] == 1
+            client.post(f"/api/sweets/{sweet_id}/restock", json={"quantity": 4}, headers=auth_headers)
+            response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 6}, headers=auth_headers)
+            assert response.status_code == 400
+            response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 5}, headers=auth_headers)
+            assert response.json()["quantity"] == 0
+            write_behind.stock.flush()
+            assert quantity_of(sweet_id) == 0
+        finally:
+            settings.purchase_write_behind = False
+            write_behind.stock.stop()
+            drop_checkpoint(write_behind.stock)
+            write_behind.stock = original
+
+
+def test_write_behind_flush_never_goes_below_zero():
+    sweet_id = create_sweet(2)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        stock = new_stock(journal_dir)
+        try:
+            stock._apply({sweet_id: 5}, 0)
+        finally:
+            drop_checkpoint(stock)
+
+    assert quantity_of(sweet_id) == 0